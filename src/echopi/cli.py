@@ -16,7 +16,7 @@ from echopi.gui.scope import run_scope
 from echopi.gui.sonar import run_sonar_gui
 from echopi.io import audio
 from echopi.utils.latency import measure_latency
-from echopi.utils.distance import measure_distance
+from echopi.utils.distance import measure_distance, resolve_distance_window
 from echopi import settings
 
 
@@ -245,7 +245,12 @@ def cmd_check_device(args: argparse.Namespace):
 def cmd_latency(args: argparse.Namespace):
     cfg_audio = _build_audio_cfg(args)
     cfg_chirp = ChirpConfig(start_freq=args.start, end_freq=args.end, duration=args.duration, amplitude=args.amp, fade_fraction=args.fade)
-    result = measure_latency(cfg_audio, cfg_chirp, repeats=args.repeats, discard=args.discard)
+    try:
+        result = measure_latency(cfg_audio, cfg_chirp, repeats=args.repeats, discard=args.discard)
+    except ValueError as e:
+        print(f"✗ Latency measurement failed: {e}")
+        print("  Tip: place speaker 1–5 cm from microphone and re-run.")
+        raise SystemExit(1)
     
     latency_s = result['latency_seconds']
     std_s = result.get('latency_std_seconds', 0.0)
@@ -309,10 +314,8 @@ def cmd_distance(args: argparse.Namespace):
         print(f"Using system latency from {config_file}: {sys_latency*1000:.3f} ms")
         print()
     
-    # Use min_distance from config if not specified
-    min_dist = args.min_distance
-    if min_dist is None:
-        min_dist = settings.get_min_distance()
+    # Use min/max distance from config if not specified
+    min_dist, max_dist = resolve_distance_window(args.min_distance, args.max_distance)
     
     result = measure_distance(
         cfg_audio, 
@@ -321,7 +324,7 @@ def cmd_distance(args: argparse.Namespace):
         system_latency_s=sys_latency, 
         reference_fade=args.ref_fade,
         min_distance_m=min_dist,
-        max_distance_m=args.max_distance,
+        max_distance_m=max_dist,
         filter_size=args.filter
     )
     
@@ -333,7 +336,7 @@ def cmd_distance(args: argparse.Namespace):
         print(f"Echo window: {result['extra_record_seconds']*1000:.1f} ms")
     print(f"Time of flight: {result['time_of_flight_s']*1000:.3f} ms")
     print(f"Lag samples: {result['lag_samples']} (refined: {result['refined_lag']:.2f})")
-    print(f"Peak: {result['peak']:.1f} (refined: {result['refined_peak']:.1f})")
+    print(f"Echo peak: {result['refined_peak']:.1f} (correlation max: {result['corr_max']:.1f})")
     print()
     print("="*60)
     distance = result.get('smoothed_distance_m', result['distance_m'])
@@ -18,7 +18,9 @@ def generate_chirp(cfg: ChirpConfig, sample_rate: int | None = None) -> np.ndarr
         window[:fade_len] = ramp
         window[-fade_len:] = ramp[::-1]
         sweep *= window
-    return (cfg.amplitude * sweep).astype(np.float32)
+    # Phase is computed in float64 for accuracy; only the result is float32
+    sweep *= cfg.amplitude
+    return sweep.astype(np.float32)
 
 
 def normalize(signal: np.ndarray, peak: float = 0.9) -> np.ndarray:
@@ -34,7 +36,8 @@ def normalize(signal: np.ndarray, peak: float = 0.9) -> np.ndarray:
     signal = np.asarray(signal, dtype=np.float32)
     
     # Find maximum absolute value
-    max_val = np.max(np.abs(signal))
+    # (max/min instead of max(abs()) avoids a temporary the size of signal)
+    max_val = max(float(signal.max()), -float(signal.min()))
     
     # Protection against division by zero or very small numbers
     # If signal is too small, return zero signal
@@ -43,10 +46,12 @@ def normalize(signal: np.ndarray, peak: float = 0.9) -> np.ndarray:
     
     # Normalization with protection against numerical errors
     # Use more stable method to avoid amplitude jumps
-    normalized = (signal / max_val * peak).astype(np.float32)
+    # (float32 in, float32 out: scale in place, no extra converted copy)
+    normalized = signal / max_val
+    normalized *= peak
     
     # Check result (protection against overflow)
-    actual_max = np.max(np.abs(normalized))
+    actual_max = max(float(normalized.max()), -float(normalized.min()))
     if actual_max > peak * 1.01:  # Allow 1% deviation due to numerical errors
         # Recalculate with more precise normalization
         normalized = (signal / max_val * peak).astype(np.float32)
@@ -1,9 +1,33 @@
 from __future__ import annotations
 
 import numpy as np
+from scipy import fft as sp_fft
 
 
-def cross_correlation(ref: np.ndarray, sig: np.ndarray) -> tuple[int, float, np.ndarray]:
+def _fft_size(n_sig: int, n_ref: int) -> int:
+    """Power-of-2 FFT length for a full linear correlation."""
+    n = n_sig + n_ref - 1
+    return 2 ** int(np.ceil(np.log2(n)))
+
+
+def reference_spectrum(ref: np.ndarray, sig_len: int) -> np.ndarray:
+    """Precompute conj(RFFT(ref)) for cross_correlation against sig_len samples.
+
+    The reference is usually fixed across many measurements; passing this
+    to cross_correlation skips one FFT and its buffers per call.
+    """
+    ref = np.asarray(ref, dtype=np.float32)
+    spectrum = np.conj(sp_fft.rfft(ref, n=_fft_size(sig_len, len(ref))))
+    spectrum.setflags(write=False)
+    return spectrum
+
+
+def cross_correlation(
+    ref: np.ndarray,
+    sig: np.ndarray,
+    ref_spectrum: np.ndarray | None = None,
+    max_lag: int | None = None,
+) -> tuple[int, float, np.ndarray]:
     """Cross-correlation between reference signal and recorded signal using FFT method.
     
     FFT-based correlation is significantly faster than direct correlation:
@@ -12,34 +36,64 @@ def cross_correlation(ref: np.ndarray, sig: np.ndarray) -> tuple[int, float, np.
     For typical chirp signals (N~3000, M~2400), FFT is ~80x faster.
     
     Implementation uses standard FFT convolution theorem:
-    corr(x, y) = IFFT(FFT(x) * conj(FFT(y)))
+    corr(x, y) = IRFFT(RFFT(x) * conj(RFFT(y)))
+    
+    Both inputs are real, so real-input transforms (scipy.fft.rfft/irfft)
+    compute only the non-redundant half spectrum. scipy.fft caches its
+    plans (twiddle factors) per length, so repeated same-size calls reuse them.
+    
+    The transforms run in float32; the relative error (~1e-6 of the peak)
+    is far below what matters for peak picking and sub-sample interpolation.
     
     Args:
-        ref: Reference signal (e.g., reversed chirp for matched filter)
+        ref: Reference signal (matched filter: the chirp itself, not
+            reversed; corr[k] is then the match at a delay of k samples)
         sig: Recorded signal
+        ref_spectrum: Optional reference_spectrum(ref, len(sig)), with len(sig)
+            after the max_lag trim. It must be computed from this same ref;
+            that is not checked, only its FFT length is
+        max_lag: If given, only corr[:max_lag + 1] is needed. corr[i] depends
+            on sig[i:i + len(ref)] only, so sig is first trimmed to
+            max_lag + len(ref) samples, shrinking the FFT (values up to
+            max_lag are unchanged; later ones cover the trimmed sig).
+    
+    Raises:
+        ValueError: If ref_spectrum was made for a different FFT length
     
     Returns:
         peak_idx: Sample index in corr array where peak is found
         peak: Peak correlation value
-        corr: Full correlation array (length = len(sig) + len(ref) - 1)
+        corr: Full correlation array, float32 (length = len(sig) + len(ref) - 1)
     """
-    ref = ref.astype(np.float32)
-    sig = sig.astype(np.float32)
+    # Single precision throughout (recordings are float32): scipy.fft then
+    # runs float32 transforms, halving memory traffic vs. float64
+    ref = np.asarray(ref, dtype=np.float32)
+    sig = np.asarray(sig, dtype=np.float32)
+    if max_lag is not None and max_lag + len(ref) < len(sig):
+        sig = sig[:max_lag + len(ref)]
     
     # FFT-based correlation using convolution theorem
     # Pad to next power of 2 for FFT efficiency
     n = len(sig) + len(ref) - 1
-    n_fft = 2 ** int(np.ceil(np.log2(n)))
+    n_fft = _fft_size(len(sig), len(ref))
+    if ref_spectrum is None:
+        ref_spectrum = reference_spectrum(ref, len(sig))
+    elif ref_spectrum.shape != (n_fft // 2 + 1,):
+        raise ValueError(
+            f"ref_spectrum has shape {ref_spectrum.shape}, expected "
+            f"({n_fft // 2 + 1},) for len(ref)={len(ref)}, len(sig)={len(sig)}"
+        )
     
-    # FFT of both signals (zero-padded to n_fft)
-    fft_ref = np.fft.fft(ref, n=n_fft)
-    fft_sig = np.fft.fft(sig, n=n_fft)
+    # Real FFT of the signal (zero-padded to n_fft)
+    fft_sig = sp_fft.rfft(sig, n=n_fft)
     
     # Cross-correlation in frequency domain: multiply by complex conjugate
-    fft_corr = fft_sig * np.conj(fft_ref)
+    # (in place: fft_sig is a temporary we own)
+    fft_sig *= ref_spectrum
     
-    # IFFT to get correlation in time domain
-    corr_full = np.fft.ifft(fft_corr).real
+    # Inverse real FFT to get correlation in time domain; the spectrum is
+    # not needed afterwards, so scipy may reuse its buffer
+    corr_full = sp_fft.irfft(fft_sig, n=n_fft, overwrite_x=True)
     
     # Trim to actual correlation length (remove zero padding)
     corr = corr_full[:n]
@@ -51,29 +105,77 @@ def cross_correlation(ref: np.ndarray, sig: np.ndarray) -> tuple[int, float, np.
     return peak_idx, peak, corr
 
 
-def find_peaks(corr: np.ndarray, num_peaks: int = 5, min_distance: int = 100) -> list[tuple[int, float]]:
+def correlate_lags(ref: np.ndarray, sig: np.ndarray, start_lag: int, stop_lag: int) -> np.ndarray:
+    """Direct cross-correlation evaluated only for lags in [start_lag, stop_lag).
+
+    When only a short lag range is of interest (e.g. latency calibration,
+    ~100 lags against a 2400-tap chirp), a direct dot product per lag is
+    cheaper than a full FFT correlation of the whole recording.
+
+    Values match cross_correlation(ref, sig)[start_lag:stop_lag] for
+    non-negative lags (samples past the end of sig count as zero), up to
+    float32 rounding: the dot products run in the recording's native float32,
+    which halves memory traffic and needs no conversion copy.
+
+    Args:
+        ref: Reference signal
+        sig: Recorded signal
+        start_lag: First lag (inclusive, >= 0)
+        stop_lag: Last lag (exclusive)
+
+    Returns:
+        Correlation values (float32), one per lag
+    """
+    ref = np.asarray(ref, dtype=np.float32)
+    start_lag = max(0, int(start_lag))
+    stop_lag = max(start_lag, int(stop_lag))
+    if stop_lag == start_lag or ref.size == 0:
+        return np.zeros(stop_lag - start_lag, dtype=np.float32)
+
+    seg_len = stop_lag - start_lag + ref.size - 1
+    seg = np.asarray(sig[start_lag:start_lag + seg_len], dtype=np.float32)
+    if seg.size < seg_len:
+        # Zero-pad past the end of sig
+        seg = np.concatenate([seg, np.zeros(seg_len - seg.size, dtype=np.float32)])
+
+    windows = np.lib.stride_tricks.sliding_window_view(seg, ref.size)
+    return windows @ ref
+
+
+def find_peaks(
+    corr: np.ndarray,
+    num_peaks: int = 5,
+    min_distance: int = 100,
+    min_ratio: float = 0.0,
+) -> list[tuple[int, float]]:
     """Find multiple peaks in correlation.
     
     Args:
         corr: Correlation array
         num_peaks: Number of peaks to find
         min_distance: Minimum distance between peaks
+        min_ratio: Only return peaks above min_ratio * strongest peak.
+            Peaks come out strongest first, so the search stops at the
+            first weaker one instead of running all num_peaks passes.
         
     Returns:
         List of tuples (index, value) for each peak
     """
     peaks = []
     corr_copy = corr.copy()
+    threshold = 0.0
     
     for _ in range(num_peaks):
         # Find maximum
         idx = int(np.argmax(corr_copy))
         value = float(corr_copy[idx])
         
-        if value <= 0:
+        if value <= threshold:
             break
             
         peaks.append((idx, value))
+        if not threshold and min_ratio > 0:
+            threshold = value * min_ratio
         
         # Zero out region around found peak
         start = max(0, idx - min_distance)
@@ -13,7 +13,11 @@ from echopi.config import AudioDeviceConfig
 
 
 def _check_x11_display() -> bool:
-    """Checks if an X11 display is available."""
+    """Checks if an X11 or Wayland display is available."""
+    # Native Wayland session (DISPLAY may be unset without XWayland)
+    if os.environ.get("WAYLAND_DISPLAY") or os.environ.get("QT_QPA_PLATFORM", "").startswith("wayland"):
+        return True
+    
     display = os.environ.get("DISPLAY")
     if not display:
         return False
@@ -41,7 +45,7 @@ def run_scope(cfg: AudioDeviceConfig, update_interval_ms: int = 500, demo_mode:
     
     # Check if X11 display is available
     if not _check_x11_display():
-        print("ERROR: No X11 display available!", file=sys.stderr)
+        print("ERROR: No X11 or Wayland display available!", file=sys.stderr)
         print("\nNo X11 server is running on this device.", file=sys.stderr)
         print("To launch the GUI, do one of the following:", file=sys.stderr)
         print("  1. Start X11 server locally: startx", file=sys.stderr)
@@ -9,7 +9,7 @@ from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QSlider, QSpinBox, QDoubleSpinBox, QPushButton, QGroupBox, QRadioButton
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QSignalBlocker
 from PyQt5.QtGui import QFont
 
 from echopi.config import AudioDeviceConfig
@@ -176,33 +176,29 @@ class SignalGenerator(QMainWindow):
         """Handler for frequency change via slider."""
         self.frequency = value
         self.freq_label.setText(f"Frequency: {self.frequency} Hz")
-        self.freq_spinbox.blockSignals(True)
-        self.freq_spinbox.setValue(value)
-        self.freq_spinbox.blockSignals(False)
+        with QSignalBlocker(self.freq_spinbox):
+            self.freq_spinbox.setValue(value)
         
     def on_frequency_spinbox_changed(self, value):
         """Handler for frequency change via spinbox."""
         self.frequency = value
         self.freq_label.setText(f"Frequency: {self.frequency} Hz")
-        self.freq_slider.blockSignals(True)
-        self.freq_slider.setValue(value)
-        self.freq_slider.blockSignals(False)
+        with QSignalBlocker(self.freq_slider):
+            self.freq_slider.setValue(value)
         
     def on_amplitude_changed(self, value):
         """Handler for amplitude change via slider."""
         self.amplitude = value / 100.0
         self.amp_label.setText(f"Amplitude: {self.amplitude:.2f}")
-        self.amp_spinbox.blockSignals(True)
-        self.amp_spinbox.setValue(self.amplitude)
-        self.amp_spinbox.blockSignals(False)
+        with QSignalBlocker(self.amp_spinbox):
+            self.amp_spinbox.setValue(self.amplitude)
         
     def on_amplitude_spinbox_changed(self, value):
         """Handler for amplitude change via spinbox."""
         self.amplitude = value
         self.amp_label.setText(f"Amplitude: {self.amplitude:.2f}")
-        self.amp_slider.blockSignals(True)
-        self.amp_slider.setValue(int(value * 100))
-        self.amp_slider.blockSignals(False)
+        with QSignalBlocker(self.amp_slider):
+            self.amp_slider.setValue(int(value * 100))
         
     def on_mode_changed(self):
         """Handler for mode change."""
@@ -11,11 +11,15 @@ logic and calculations MUST remain in the Core echopi modules.
 """
 from __future__ import annotations
 
+import atexit
+import functools
+import logging
+import logging.handlers
 import os
+import queue
 import sys
 import threading
 import time
-import tracemalloc
 import psutil
 
 import numpy as np
@@ -35,8 +39,85 @@ from echopi.io import audio_safe as audio
 from echopi import settings
 
 
+logger = logging.getLogger("echopi.gui.sonar")
+_log_listener: logging.handlers.QueueListener | None = None
+
+
+def _setup_logging():
+    """Route GUI log output through a queue drained by a background thread.
+
+    Slots on the UI thread only enqueue records; the listener thread does the
+    actual (possibly blocking) stdout write.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+# Start/stop button: one stylesheet, state selected by the "running" property
+_START_BTN_QSS = """
+    QPushButton {
+        background-color: #4CAF50;
+        color: white;
+        font-size: 16px;
+        font-weight: bold;
+        padding: 15px;
+        border-radius: 5px;
+    }
+    QPushButton:hover {
+        background-color: #45a049;
+    }
+    QPushButton[running="true"] {
+        background-color: #f44336;
+    }
+    QPushButton[running="true"]:hover {
+        background-color: #da190b;
+    }
+"""
+
+
+@functools.lru_cache(maxsize=32)
+def _echo_s_cached(medium: str, max_distance_m: float) -> float:
+    """Memoized echo window for (medium, max_distance_m)."""
+    return compute_extra_record_seconds(medium=medium, max_distance_m=max_distance_m)
+
+
+def _result_warning(distance_m: float, peak: float, memory_warning: str = "") -> str:
+    """Warning text for a successful measurement ("" if none applies).
+
+    The memory warning (sampled by the memory timer) takes precedence.
+    """
+    if memory_warning:
+        return memory_warning
+    # Distance is 0 or very small
+    if distance_m < 0.01:
+        return (
+            "⚠️ Distance is 0 or very small!\n"
+            "Check: 1) Speaker/mic connected? 2) Volume up? 3) Object in front?"
+        )
+    if peak < 0.1:
+        return (
+            f"⚠️ Weak echo signal (peak: {peak:.3f})\n"
+            "Try: Increase amplitude, bring object closer, or reduce background noise"
+        )
+    return ""
+
+
 def _check_x11_display() -> bool:
-    """Checks if an X11 display is available."""
+    """Checks if an X11 or Wayland display is available."""
+    # Native Wayland session (DISPLAY may be unset without XWayland)
+    if os.environ.get("WAYLAND_DISPLAY") or os.environ.get("QT_QPA_PLATFORM", "").startswith("wayland"):
+        return True
+    
     display = os.environ.get("DISPLAY")
     if not display:
         return False
@@ -48,6 +129,49 @@ def _check_x11_display() -> bool:
     return True
 
 
+class _LatencyRunnable(QtCore.QRunnable):
+    """Run a latency measurement on the global QThreadPool.
+
+    Pool threads are reused between presses of the Measure button, so no
+    OS thread is created per measurement.
+    """
+
+    def __init__(self, target):
+        super().__init__()
+        self._target = target
+
+    def run(self):
+        # Audio I/O is timing sensitive: reduce scheduling jitter
+        QtCore.QThread.currentThread().setPriority(QtCore.QThread.Priority.HighPriority)
+        try:
+            self._target()
+        finally:
+            QtCore.QThread.currentThread().setPriority(QtCore.QThread.Priority.NormalPriority)
+
+
+class _MeasurementWorker(QtCore.QObject):
+    """Run measurement steps in the event loop of a worker QThread.
+
+    step() returns the delay in ms before the next call, or None to stop.
+    Waiting between steps is a QTimer in the worker thread's event loop, so
+    QThread.quit() stops the loop without waiting out the interval.
+    """
+
+    stopped = QtCore.pyqtSignal()
+
+    def __init__(self, step):
+        super().__init__()
+        self._step = step
+
+    @QtCore.pyqtSlot()
+    def run_once(self):
+        delay_ms = self._step()
+        if delay_ms is None:
+            self.stopped.emit()
+        else:
+            QtCore.QTimer.singleShot(delay_ms, self.run_once)
+
+
 class SonarGUI(QtCore.QObject):
     """Interactive GUI for sonar visualization.
     
@@ -65,7 +189,7 @@ class SonarGUI(QtCore.QObject):
     """
     
     # Signals for thread-safe UI updates
-    update_signal = QtCore.pyqtSignal(dict)
+    update_signal = QtCore.pyqtSignal()  # new result in _latest_result
     latency_signal = QtCore.pyqtSignal(dict)
     
     def __init__(
@@ -75,13 +199,26 @@ class SonarGUI(QtCore.QObject):
         max_distance_m: float | None = None,
     ):
         super().__init__()
+        _setup_logging()
         self.cfg = cfg
         self.fullscreen = fullscreen
         self.running = False
-        self.measurement_thread = None
+        self._measurement_count = 0
+        # Measurements run on a worker QThread; steps are rescheduled by
+        # QTimer.singleShot in that thread's event loop (see _MeasurementWorker)
+        self._worker_thread = QtCore.QThread()
+        self._worker = _MeasurementWorker(self._measurement_step)
+        self._worker.moveToThread(self._worker_thread)
+        self._worker_thread.started.connect(self._worker.run_once)
+        self._worker.stopped.connect(self._worker_thread.quit)
+        # Reusable capture buffer for latency calibration: holds all repeats
+        # back to back (7 x (10 ms chirp + 20 ms window) is well under 1.1 s)
+        self._latency_rec_buf = np.empty(int(cfg.sample_rate * 1.1), dtype=np.float32)
         
         # Default parameters (load from init.json)
         gui_s = settings.get_gui_settings()
+        # Last values known to be on disk; used to skip no-op writes.
+        self._persisted_settings: dict = dict(gui_s)
         self.start_freq = float(gui_s.get("start_freq_hz", 2000.0))
         self.end_freq = float(gui_s.get("end_freq_hz", 20000.0))
         self.duration = float(gui_s.get("chirp_duration_s", 0.05))
@@ -90,44 +227,101 @@ class SonarGUI(QtCore.QObject):
         # Max distance controls echo record window (separate from chirp duration).
         # Default comes from init.json; CLI can override.
         if max_distance_m is None:
-            self.max_distance_m = float(gui_s.get("max_distance_m", settings.get_max_distance()))
+            self.max_distance_m = float(gui_s["max_distance_m"])
         else:
             self.max_distance_m = float(max_distance_m)
             # Persist CLI override so next GUI start keeps it.
             try:
                 settings.set_max_distance(self.max_distance_m)
+                self._persisted_settings["max_distance_m"] = self.max_distance_m
             except Exception as e:
-                print(f"Warning: failed to persist max_distance_m: {e}")
+                logger.warning("Warning: failed to persist max_distance_m: %s", e)
+
+        # Echo window depends only on (medium, max distance); refreshed in
+        # _refresh_echo_window, read by the duration/update-rate validators.
+        self._echo_s = _echo_s_cached(self.medium, self.max_distance_m)
 
         self.filter_size = int(gui_s.get("filter_size", 3))
         self.normalize_recorded = bool(gui_s.get("normalize_recorded", False))
         self.update_rate_hz = float(gui_s.get("update_rate_hz", 2.0))
-        # Load system latency from config file (init.json if exists, otherwise default)
-        self.system_latency = float(gui_s.get("system_latency_s", settings.get_system_latency()))
+        # System latency from init.json (get_gui_settings fills in the default)
+        self.system_latency = float(gui_s["system_latency_s"])
         # Load min_distance from config (used to filter out near reflections)
-        self.min_distance_m = float(gui_s.get("min_distance_m", settings.get_min_distance()))
+        self.min_distance_m = float(gui_s["min_distance_m"])
         
-        # Measurement history
-        self.history_time = []
-        self.history_distance = []
+        # Measurement history: ring buffer of (count, distance, ToF ms) rows.
+        # Each sample is written twice (slots i and i + max_history) so the
+        # last N samples are always one contiguous slice -> no copies for setData.
         self.max_history = 100
+        self._hist = np.zeros((3, 2 * self.max_history), dtype=np.float64)
+        self._hist_head = 0
+        self._hist_len = 0
+        # Y ranges of distance/ToF rows: [lo, hi] as last applied to the plots.
+        # Rescaled only when a sample leaves the hysteresis band, or once per
+        # history wrap so the range can shrink again.
+        self._y_ranges = {1: None, 2: None}
+        self._y_rescale = False
+        self._since_rescale = 0
         
         # Memory monitoring
         self.process = psutil.Process()
         self.initial_memory_mb = self.process.memory_info().rss / 1024 / 1024
-        tracemalloc.start()
+        # Allocation tracing slows every allocation; opt-in for debugging only
+        if os.environ.get("ECHOPI_TRACEMALLOC") == "1":
+            import tracemalloc
+            tracemalloc.start()
+        
+        # Latest result from the measurement thread. Only one update signal is
+        # in flight at a time; newer results overwrite unread ones, so a
+        # stalled UI thread renders the newest result once instead of a backlog.
+        self._latest_result = None
+        self._latest_lock = threading.Lock()
+        # Error results reuse one dict, refilled under _latest_lock
+        self._err_dict = {'error': '', 'count': 0, 'exception_type': ''}
+        # Last text set per result label (see _set_label)
+        self._label_cache = {}
         
         # Connect signals
-        self.update_signal.connect(self._update_display)
+        self.update_signal.connect(self._on_result_ready)
         self.latency_signal.connect(self._latency_measured)
         
         self._setup_ui()
     
     def _setup_ui(self):
         """Create user interface."""
-        pg.setConfigOptions(antialias=False)
+        # Pin the plain raster path: no antialiasing, OpenGL or experimental code
+        pg.setConfigOptions(
+            antialias=False,
+            useOpenGL=False,
+            enableExperimental=False,
+            background="k",
+            foreground="w",
+        )
         self.app = pg.mkQApp("EchoPi Sonar")
         
+        # Debounced settings persistence: rapid spinbox changes are coalesced
+        # so only the final value of a burst is written to init.json.
+        self._pending_settings: dict = {}
+        self._save_timer = QtCore.QTimer()
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(200)
+        self._save_timer.timeout.connect(self._flush_pending_settings)
+
+        # Plot rendering is decoupled from measurement rate: results only mark
+        # the history dirty, and this timer redraws at most ~30 times/s.
+        self._plot_dirty = False
+        self._render_timer = QtCore.QTimer()
+        self._render_timer.setInterval(33)
+        self._render_timer.timeout.connect(self._render_plots)
+
+        # Memory usage is sampled at 1 Hz, independent of measurement rate
+        self._memory_warning = ""
+        self._rss_prev_mb = 0.0
+        self._mem_timer = QtCore.QTimer()
+        self._mem_timer.setInterval(1000)
+        self._mem_timer.timeout.connect(self._sample_memory)
+        self._mem_timer.start()
+
         # Main window
         self.win = QtWidgets.QWidget()
         self.win.setWindowTitle("EchoPi Sonar - Interactive")
@@ -150,15 +344,23 @@ class SonarGUI(QtCore.QObject):
         self.distance_plot.setLabel("left", "Distance", units="m")
         self.distance_plot.setLabel("bottom", "Measurement", units="#")
         self.distance_plot.showGrid(x=True, y=True, alpha=0.3)
-        self.distance_curve = self.distance_plot.plot(pen=pg.mkPen("g", width=2))
+        self.distance_curve = self.distance_plot.plot(pen=pg.mkPen("g", width=2), symbol=None)
+        # Line only (no symbols, so the scatter item stays empty); kept as
+        # PlotDataItem for downsampling and clip-to-view
+        self.distance_curve.setDownsampling(auto=True, method="peak")
+        self.distance_curve.setClipToView(True)
+        # Ranges are set explicitly in _render_plots
+        self.distance_plot.disableAutoRange()
         
         # Time of flight history plot
         self.tof_plot = graph_widget.addPlot(title="Time of Flight History", row=1, col=0)
         self.tof_plot.setLabel("left", "ToF", units="ms")
         self.tof_plot.setLabel("bottom", "Measurement", units="#")
         self.tof_plot.showGrid(x=True, y=True, alpha=0.3)
-        self.tof_curve = self.tof_plot.plot(pen=pg.mkPen("c", width=2))
-        self.history_tof = []
+        self.tof_curve = self.tof_plot.plot(pen=pg.mkPen("c", width=2), symbol=None)
+        self.tof_curve.setDownsampling(auto=True, method="peak")
+        self.tof_curve.setClipToView(True)
+        self.tof_plot.disableAutoRange()
         
         # Right panel - controls
         control_panel = QtWidgets.QWidget()
@@ -173,19 +375,8 @@ class SonarGUI(QtCore.QObject):
         
         # Start/Stop button
         self.start_btn = QtWidgets.QPushButton("START SONAR")
-        self.start_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                font-size: 16px;
-                font-weight: bold;
-                padding: 15px;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
+        self.start_btn.setProperty("running", False)
+        self.start_btn.setStyleSheet(_START_BTN_QSS)
         self.start_btn.clicked.connect(self._toggle_sonar)
         control_layout.addWidget(self.start_btn)
         
@@ -401,24 +592,43 @@ class SonarGUI(QtCore.QObject):
 
         # Initialize derived echo window label and validation
         self._refresh_echo_window()
+
+        # Keep the measurement thread's parameter snapshot in sync. Connected
+        # after the per-widget handlers so clamped values are already applied.
+        for signal in (
+            self.start_freq_spin.valueChanged,
+            self.end_freq_spin.valueChanged,
+            self.duration_spin.valueChanged,
+            self.amplitude_slider.valueChanged,
+            self.medium_combo.currentTextChanged,
+            self.max_distance_spin.valueChanged,
+            self.min_distance_spin.valueChanged,
+            self.latency_spin.valueChanged,
+            self.update_rate_spin.valueChanged,
+            self.filter_spin.valueChanged,
+            self.normalize_checkbox.stateChanged,
+        ):
+            signal.connect(self._update_measurement_params)
+        self._update_measurement_params()
         
         # Initialize global persistent audio stream early
         # This prevents false first measurements by warming up the audio hardware
-        print("Initializing audio stream...")
+        logger.info("Initializing audio stream...")
         try:
             stream = audio.get_global_stream(self.cfg)
             # Aggressive warmup: several dummy measurements for voiceHAT stabilization
             # This solves floating amplitude and time-jumping measurements
             import time
             dummy_signal = np.zeros(int(self.cfg.sample_rate * 0.001), dtype=np.float32)
-            print("  Warming up audio hardware (this may take a few seconds)...")
+            logger.info("  Warming up audio hardware (this may take a few seconds)...")
             for i in range(10):  # 10 warmup cycles for full stabilization
                 stream.play_and_record(dummy_signal, extra_record_seconds=0.01, return_tx_index=False)
                 time.sleep(0.05)  # 50ms pause between warmup cycles
-            print("✓ Audio stream initialized and stabilized")
+            logger.info("✓ Audio stream initialized and stabilized")
         except Exception as e:
-            print(f"Warning: Failed to initialize audio stream: {e}")
+            logger.warning("Warning: Failed to initialize audio stream: %s", e)
     
+    @QtCore.pyqtSlot()
     def _toggle_sonar(self):
         """Enable/disable sonar."""
         if not self.running:
@@ -428,6 +638,12 @@ class SonarGUI(QtCore.QObject):
     
     def _start_sonar(self):
         """Start sonar."""
+        # A worker stopped by a validation error may still be winding down;
+        # it must be gone before the stream it uses is reset
+        if not self._stop_worker():
+            logger.warning("Sonar not started: previous measurement still running")
+            return
+
         # Clear screen on start
         self._clear_history()
 
@@ -435,176 +651,226 @@ class SonarGUI(QtCore.QObject):
         try:
             audio.close_global_stream()
         except Exception as e:
-            print(f"Warning: failed to reset audio stream: {e}")
+            logger.warning("Warning: failed to reset audio stream: %s", e)
         
         self.running = True
         # Clear smoothing buffer when starting new session
         clear_distance_smoothing()
         self.start_btn.setText("STOP SONAR")
-        self.start_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #f44336;
-                color: white;
-                font-size: 16px;
-                font-weight: bold;
-                padding: 15px;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #da190b;
-            }
-        """)
+        self._set_start_btn_running(True)
         
         # Start measurement thread
-        self.measurement_thread = threading.Thread(target=self._measurement_loop, daemon=True)
-        self.measurement_thread.start()
+        self._update_measurement_params()
+        self._render_timer.start()
+        self._measurement_count = 0
+        self._worker_thread.start()
     
     def _stop_sonar(self):
         """Stop sonar."""
-        self.running = False
-        if self.measurement_thread and self.measurement_thread.is_alive():
-            self.measurement_thread.join(timeout=3.0)
-            # Force cleanup if thread didn't stop
-            if self.measurement_thread.is_alive():
-                print("Warning: Measurement thread did not stop cleanly")
-            self.measurement_thread = None
+        self._stop_worker()
+        self._render_timer.stop()
+        self._render_plots()  # Draw results that arrived since the last frame
         
         self.start_btn.setText("START SONAR")
-        self.start_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                font-size: 16px;
-                font-weight: bold;
-                padding: 15px;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
+        self._set_start_btn_running(False)
     
-    def _measurement_loop(self):
-        """Measurement loop in separate thread.
+    def _stop_worker(self) -> bool:
+        """Stop the measurement worker; waits for at most one measurement.
+
+        Returns False if the thread is still running after the wait, in
+        which case it must not be started again (start() would be a no-op).
+        """
+        self.running = False
+        # quit() ends the worker event loop, dropping any pending step
+        self._worker_thread.quit()
+        if not self._worker_thread.wait(3000):
+            logger.warning("Measurement thread did not stop within 3 s")
+            return False
+        return True
+
+    def _set_start_btn_running(self, running: bool):
+        """Switch start button style via its "running" property.
+
+        The stylesheet is set once in _setup_ui; re-polishing applies the
+        matching selector without re-parsing any CSS.
+        """
+        self.start_btn.setProperty("running", running)
+        style = self.start_btn.style()
+        style.unpolish(self.start_btn)
+        style.polish(self.start_btn)
+
+    @staticmethod
+    def _interval_ms(update_rate: float) -> int:
+        """Measurement period in ms for update_rate (Hz); 1 s if rate <= 0."""
+        if update_rate <= 0:
+            return 1000
+        return max(1, int(round(1000.0 / update_rate)))
+
+    @QtCore.pyqtSlot()
+    def _update_measurement_params(self):
+        """Snapshot measurement parameters from the widgets (UI thread only).
+
+        A new dict is assigned on every change, so the measurement thread
+        always reads one consistent set with a single attribute load.
+        """
+        start_freq = float(self.start_freq_spin.value())
+        end_freq = float(self.end_freq_spin.value())
+        duration = float(self.duration_spin.value())
+        amplitude = float(self.amplitude_slider.value()) / 100.0
+        # Reuse the ChirpConfig while chirp parameters are unchanged
+        chirp_cfg = getattr(self, "_measure_params", {}).get("chirp_cfg")
+        if chirp_cfg is None or (
+            chirp_cfg.start_freq, chirp_cfg.end_freq, chirp_cfg.duration, chirp_cfg.amplitude
+        ) != (start_freq, end_freq, duration, amplitude):
+            chirp_cfg = ChirpConfig(
+                start_freq=start_freq,
+                end_freq=end_freq,
+                duration=duration,
+                amplitude=amplitude,
+                fade_fraction=0.0
+            )
+        self._measure_params = {
+            "chirp_cfg": chirp_cfg,
+            "medium": str(self.medium_combo.currentText()),
+            "max_distance_m": float(self.max_distance_spin.value()),
+            "min_distance_m": float(self.min_distance_spin.value()),
+            "system_latency": float(self.latency_spin.value()),
+            # Measurement period as a QTimer interval
+            "interval_ms": self._interval_ms(float(self.update_rate_spin.value())),
+            "filter_size": int(self.filter_spin.value()),
+            "normalize_recorded": bool(self.normalize_checkbox.isChecked()),
+        }
+
+    def _measurement_step(self) -> int | None:
+        """One measurement on the worker thread.
+        
+        Returns the delay in ms before the next step, or None to stop.
         
         NOTE: All sonar computations are delegated to Core echopi:
         - measure_distance() from echopi.utils.distance
         This GUI only reads parameters and displays results.
         """
-        measurement_count = 0
+        if not self.running:
+            logger.debug("Measurement loop stopped after %d measurements", self._measurement_count)
+            return None
         
-        while self.running:
-            try:
-                loop_t0 = time.monotonic()
-
-                # Read parameters from UI
-                start_freq = float(self.start_freq_spin.value())
-                end_freq = float(self.end_freq_spin.value())
-                duration = float(self.duration_spin.value())
-                amplitude = float(self.amplitude_slider.value()) / 100.0
-                medium = str(self.medium_combo.currentText())
-                max_distance_m = float(self.max_distance_spin.value())
-                min_distance_m = float(self.min_distance_spin.value())
-                system_latency = float(self.latency_spin.value())
-                update_rate = float(self.update_rate_spin.value())
-                filter_size = int(self.filter_spin.value())
-                normalize_recorded = bool(self.normalize_checkbox.isChecked())
-                
-                # Create chirp configuration
-                chirp_cfg = ChirpConfig(
-                    start_freq=start_freq,
-                    end_freq=end_freq,
-                    duration=duration,
-                    amplitude=amplitude,
-                    fade_fraction=0.0
-                )
-                
-                # Perform measurement (Core echopi)
-                result = measure_distance(
-                    self.cfg,
-                    chirp_cfg,
-                    medium=medium,
-                    system_latency_s=system_latency,
-                    reference_fade=0.05,
-                    min_distance_m=min_distance_m,
-                    max_distance_m=max_distance_m,
-                    filter_size=filter_size,
-                    normalize_recorded=normalize_recorded
-                )
-                
-                measurement_count += 1
-                
-                # Create a copy to avoid modifying Core echopi result dict
-                result_copy = dict(result)
-                result_copy['count'] = measurement_count
-                
-                # Send result via signal
-                self.update_signal.emit(result_copy)
-
-                # Wait before next measurement.
-                # IMPORTANT: do not add artificial +100ms here.
-                # The measurement itself already includes audio I/O time.
-                # We only sleep the remaining time to match requested update_rate.
-                interval = 1.0 / update_rate if update_rate > 0 else 1.0
-                elapsed = time.monotonic() - loop_t0
-                sleep_s = interval - elapsed
-                if sleep_s > 0:
-                    time.sleep(sleep_s)
-                
-            except ValueError as e:
-                # Parameter validation error from core
-                measurement_count += 1
-                error_msg = f"Parameter validation failed: {str(e)}"
-                print(f"❌ {error_msg}")
-                self.update_signal.emit({
-                    'error': error_msg,
-                    'count': measurement_count,
-                    'exception_type': 'ValueError'
-                })
-                # Stop on validation error - parameters need to be fixed
-                self.running = False
-                break
-                
-            except Exception as e:
-                measurement_count += 1
-                error_msg = f"Measurement #{measurement_count} failed: {str(e)[:100]}"
-                print(error_msg)
-                print("=" * 70)
-                import traceback
-                traceback.print_exc()
-                print("=" * 70)
-                # Send error to GUI
-                self.update_signal.emit({
-                    'error': error_msg, 
-                    'count': measurement_count,
-                    'exception_type': type(e).__name__
-                })
-                # Longer sleep on error to prevent rapid memory allocation
-                time.sleep(2.0)
-        
-        print(f"Measurement loop stopped after {measurement_count} measurements")
+        try:
+            loop_t0 = time.monotonic()
+
+            # Parameter snapshot maintained by the UI thread (never touch
+            # widgets from this thread)
+            params = self._measure_params
+            chirp_cfg = params["chirp_cfg"]
+            medium = params["medium"]
+            max_distance_m = params["max_distance_m"]
+            min_distance_m = params["min_distance_m"]
+            system_latency = params["system_latency"]
+            interval_ms = params["interval_ms"]
+            filter_size = params["filter_size"]
+            normalize_recorded = params["normalize_recorded"]
+            
+            # Perform measurement (Core echopi)
+            result = measure_distance(
+                self.cfg,
+                chirp_cfg,
+                medium=medium,
+                system_latency_s=system_latency,
+                reference_fade=0.05,
+                min_distance_m=min_distance_m,
+                max_distance_m=max_distance_m,
+                filter_size=filter_size,
+                normalize_recorded=normalize_recorded
+            )
+            
+            self._measurement_count += 1
+            
+            # measure_distance() returns a fresh dict per call: annotate in place
+            result['count'] = self._measurement_count
+            
+            # Hand result to the UI thread
+            self._post_result(result)
+
+            # Wait before next measurement.
+            # IMPORTANT: do not add artificial +100ms here.
+            # The measurement itself already includes audio I/O time.
+            # We only wait the remaining time to match requested update_rate.
+            elapsed_ms = int((time.monotonic() - loop_t0) * 1000)
+            return max(0, interval_ms - elapsed_ms)
+            
+        except ValueError as e:
+            # Parameter validation error from core
+            self._measurement_count += 1
+            error_msg = f"Parameter validation failed: {str(e)}"
+            logger.warning("❌ %s", error_msg)
+            self._post_error(error_msg, 'ValueError')
+            # Stop on validation error - parameters need to be fixed
+            self.running = False
+            return None
+            
+        except Exception as e:
+            self._measurement_count += 1
+            error_msg = f"Measurement #{self._measurement_count} failed: {str(e)[:100]}"
+            logger.exception(error_msg)
+            # Send error to GUI
+            self._post_error(error_msg, type(e).__name__)
+            # Longer pause on error to prevent rapid memory allocation
+            return 2000
     
-    @QtCore.pyqtSlot(dict)
+    def _post_result(self, result: dict):
+        """Store result for the UI thread (measurement thread side)."""
+        with self._latest_lock:
+            signal_pending = self._latest_result is not None
+            self._latest_result = result
+        if not signal_pending:
+            self.update_signal.emit()
+
+    def _post_error(self, error_msg: str, exception_type: str):
+        """Post an error result using the reused error dict (worker thread)."""
+        with self._latest_lock:
+            err = self._err_dict
+            err['error'] = error_msg
+            err['count'] = self._measurement_count
+            err['exception_type'] = exception_type
+            signal_pending = self._latest_result is not None
+            self._latest_result = err
+        if not signal_pending:
+            self.update_signal.emit()
+
+    @QtCore.pyqtSlot()
+    def _on_result_ready(self):
+        """Display the newest result; stale ones were already overwritten."""
+        with self._latest_lock:
+            result = self._latest_result
+            self._latest_result = None
+            if result is self._err_dict:
+                # Shown under the lock: the worker refills this dict in place
+                self._update_display(result)
+                return
+        if result is not None:
+            self._update_display(result)
+
+    def _set_label(self, label: QtWidgets.QLabel, text: str):
+        """setText() only when the text differs from what was last set."""
+        if self._label_cache.get(label) != text:
+            label.setText(text)
+            self._label_cache[label] = text
+
     def _update_display(self, result: dict):
         """Update display of results (in main thread)."""
         try:
             # Check for error message
             if 'error' in result:
-                error_text = f"⚠️ {result['error']}"
-                if 'exception_type' in result:
-                    error_text += f"\nType: {result['exception_type']}"
-                self.error_label.setText(error_text)
+                exception_type = result.get('exception_type')
+                error_text = (
+                    f"⚠️ {result['error']}\nType: {exception_type}"
+                    if exception_type is not None
+                    else f"⚠️ {result['error']}"
+                )
+                self._set_label(self.error_label, error_text)
                 if 'count' in result:
-                    self.count_label.setText(f"Measurements: {result['count']}")
-                # Update memory even on error
-                current_memory_mb = self.process.memory_info().rss / 1024 / 1024
-                memory_delta = current_memory_mb - self.initial_memory_mb
-                self.memory_label.setText(f"Memory: {current_memory_mb:.1f} MB (+{memory_delta:.1f})")
+                    self._set_label(self.count_label, f"Measurements: {result['count']}")
                 return
             
-            # Clear error label on successful measurement
-            self.error_label.setText("")
-            
             # Get smoothed distance from core (distance.py handles smoothing)
             smoothed_distance = result.get('smoothed_distance_m', result['distance_m'])
             distance_m = result['distance_m']
@@ -613,74 +879,119 @@ class SonarGUI(QtCore.QObject):
             sound_speed = result['sound_speed']
             count = result['count']
             
-            # Show warning if distance is 0 or very small
-            if smoothed_distance < 0.01:
-                self.error_label.setText(
-                    "⚠️ Distance is 0 or very small!\n"
-                    "Check: 1) Speaker/mic connected? 2) Volume up? 3) Object in front?"
-                )
-            elif peak < 0.1:
-                self.error_label.setText(
-                    f"⚠️ Weak echo signal (peak: {peak:.3f})\n"
-                    "Try: Increase amplitude, bring object closer, or reduce background noise"
-                )
+            # Error label is cleared on successful measurement unless a warning applies
+            self._set_label(
+                self.error_label,
+                _result_warning(smoothed_distance, peak, self._memory_warning),
+            )
             
             # Update text labels (use smoothed distance for display)
-            self.distance_label.setText(f"Distance: {smoothed_distance:.3f} m")
-            self.distance_cm_label.setText(f"({smoothed_distance * 100:.1f} cm)")
-            self.tof_label.setText(f"Time of Flight: {time_of_flight_s * 1000:.3f} ms")
-            self.peak_label.setText(f"Peak: {peak:.1f}")
-            self.speed_label.setText(f"Sound Speed: {sound_speed:.1f} m/s")
-            self.count_label.setText(f"Measurements: {count}")
-            
-            # Update memory usage
-            current_memory_mb = self.process.memory_info().rss / 1024 / 1024
-            memory_delta = current_memory_mb - self.initial_memory_mb
-            self.memory_label.setText(f"Memory: {current_memory_mb:.1f} MB (+{memory_delta:.1f})")
-            
-            # Warning for memory leak
-            if memory_delta > 100:
-                self.error_label.setText(
-                    f"⚠️ Memory leak detected! {memory_delta:.0f} MB increase.\n"
-                    "Consider restarting the application."
-                )
+            self._set_label(self.distance_label, f"Distance: {smoothed_distance:.3f} m")
+            self._set_label(self.distance_cm_label, f"({smoothed_distance * 100:.1f} cm)")
+            self._set_label(self.tof_label, f"Time of Flight: {time_of_flight_s * 1000:.3f} ms")
+            self._set_label(self.peak_label, f"Peak: {peak:.1f}")
+            self._set_label(self.speed_label, f"Sound Speed: {sound_speed:.1f} m/s")
+            self._set_label(self.count_label, f"Measurements: {count}")
             
             # Add to history (use smoothed distance)
-            self.history_time.append(count)
-            self.history_distance.append(smoothed_distance)
-            self.history_tof.append(time_of_flight_s * 1000)
-            
-            # Limit history size - use slicing to prevent memory fragmentation
-            if len(self.history_time) > self.max_history:
-                self.history_time = self.history_time[-self.max_history:]
-                self.history_distance = self.history_distance[-self.max_history:]
-                self.history_tof = self.history_tof[-self.max_history:]
+            self._push_history(count, smoothed_distance, time_of_flight_s * 1000)
             
-            # Update plots
-            if len(self.history_time) > 0:
-                # Use list() to create new list copies to prevent reference issues
-                self.distance_curve.setData(list(self.history_time), list(self.history_distance))
-                self.tof_curve.setData(list(self.history_time), list(self.history_tof))
-                
-                # Auto-scale
-                self.distance_plot.enableAutoRange()
-                self.tof_plot.enableAutoRange()
+            # Plots are redrawn by the render timer
+            self._plot_dirty = True
                 
         except Exception as e:
-            print(f"Display update error: {e}")
+            logger.exception("Display update error: %s", e)
+
+    @QtCore.pyqtSlot()
+    def _sample_memory(self):
+        """Update memory label from process RSS (1 Hz timer)."""
+        current_memory_mb = self.process.memory_info().rss / 1024 / 1024
+        if abs(current_memory_mb - self._rss_prev_mb) < 0.1:
+            return
+        self._rss_prev_mb = current_memory_mb
+        memory_delta = current_memory_mb - self.initial_memory_mb
+        self._set_label(self.memory_label, f"Memory: {current_memory_mb:.1f} MB (+{memory_delta:.1f})")
+        
+        if memory_delta > 100:
+            self._memory_warning = (
+                f"⚠️ Memory leak detected! {memory_delta:.0f} MB increase.\n"
+                "Consider restarting the application."
+            )
+            self._set_label(self.error_label, self._memory_warning)
+        else:
+            self._memory_warning = ""
+
+    @QtCore.pyqtSlot()
+    def _render_plots(self):
+        """Redraw history plots if new results arrived since the last frame."""
+        if not self._plot_dirty:
+            return
+        self._plot_dirty = False
+        if self._hist_len > 0:
+            hist_time, hist_distance, hist_tof = self._history_view()
+            self.distance_curve.setData(hist_time, hist_distance)
+            self.tof_curve.setData(hist_time, hist_tof)
+            
+            # X follows the history window
+            x_lo, x_hi = hist_time[0], hist_time[-1]
+            self.distance_plot.setXRange(x_lo, x_hi, padding=0.02)
+            self.tof_plot.setXRange(x_lo, x_hi, padding=0.02)
+            
+            # Y only changes when the data leaves the current range
+            if self._y_rescale:
+                self._y_rescale = False
+                self._since_rescale = 0
+                for row, data, plot in (
+                    (1, hist_distance, self.distance_plot),
+                    (2, hist_tof, self.tof_plot),
+                ):
+                    lo, hi = float(data.min()), float(data.max())
+                    self._y_ranges[row] = (lo, hi)
+                    plot.setYRange(lo, hi, padding=0.1)
     
-    def _clear_history(self):
-        """Clear measurement history."""
-        # Clear lists completely by reassigning to free memory
-        self.history_time = []
-        self.history_distance = []
-        self.history_tof = []
+    def _push_history(self, count: float, distance_m: float, tof_ms: float):
+        """Append one sample to the history ring buffer (no allocation)."""
+        cap = self.max_history
+        i = self._hist_head
+        self._hist[:, i] = (count, distance_m, tof_ms)
+        self._hist[:, i + cap] = (count, distance_m, tof_ms)
+        self._hist_head = (i + 1) % cap
+        self._hist_len = min(self._hist_len + 1, cap)
+        
+        self._since_rescale += 1
+        if self._since_rescale >= cap:
+            self._y_rescale = True
+        for row, value in ((1, distance_m), (2, tof_ms)):
+            y_range = self._y_ranges[row]
+            if y_range is None or value < y_range[0] * 0.95 or value > y_range[1] * 1.05:
+                self._y_rescale = True
+
+    def _history_view(self) -> np.ndarray:
+        """Return (3, n) view of the history in chronological order."""
+        start = self._hist_head + self.max_history - self._hist_len
+        return self._hist[:, start:start + self._hist_len]
+
+    def _drop_history(self):
+        """Drop measurement history data (no plot update)."""
+        self._hist_head = 0
+        self._hist_len = 0
+        self._y_ranges = {1: None, 2: None}
+        self._y_rescale = False
+        self._since_rescale = 0
         # Clear smoothing buffer in core
         clear_distance_smoothing()
+
+    @QtCore.pyqtSlot()
+    def _clear_history(self):
+        """Clear measurement history."""
+        self._drop_history()
+        self._plot_dirty = False
         # Clear plot curves
-        self.distance_curve.setData([], [])
-        self.tof_curve.setData([], [])
+        empty = self._hist[:, :0]
+        self.distance_curve.setData(empty[0], empty[1])
+        self.tof_curve.setData(empty[0], empty[2])
     
+    @QtCore.pyqtSlot()
     def _measure_latency(self):
         """Start latency measurement in separate thread.
         
@@ -704,7 +1015,7 @@ class SonarGUI(QtCore.QObject):
             "1. Position speaker near microphone (1-5 cm)\n"
             "2. Ensure there is no background noise\n"
             "3. Press OK to start measurement\n\n"
-            "Measurement will take ~1 second",
+            "Measurement will take a fraction of a second",
             QtWidgets.QMessageBox.StandardButton.Ok | QtWidgets.QMessageBox.StandardButton.Cancel
         )
         
@@ -715,34 +1026,41 @@ class SonarGUI(QtCore.QObject):
         self.measure_latency_btn.setEnabled(False)
         self.measure_latency_btn.setText("Measuring...")
         
-        # Start measurement in separate thread
-        thread = threading.Thread(target=self._latency_measurement_thread, daemon=True)
-        thread.start()
+        # Run measurement on the shared Qt thread pool (worker stays warm)
+        QtCore.QThreadPool.globalInstance().start(
+            _LatencyRunnable(self._latency_measurement_thread)
+        )
     
     def _latency_measurement_thread(self):
-        """Latency measurement thread.
+        """Latency measurement worker (runs on the Qt thread pool).
         
         NOTE: Actual computation is done by Core echopi:
         - measure_latency() from echopi.utils.latency
         """
         try:
-            # Create chirp configuration for measurement
+            # Create chirp configuration for measurement. Speaker and mic are
+            # 1-5 cm apart, so a short chirp and echo window are enough.
             chirp_cfg = ChirpConfig(
                 start_freq=2000.0,
                 end_freq=20000.0,
-                duration=0.05,
+                duration=0.01,
                 amplitude=0.8,
                 fade_fraction=0.0
             )
             
             # Perform measurement (Core echopi)
-            result = measure_latency(self.cfg, chirp_cfg)
+            result = measure_latency(
+                self.cfg,
+                chirp_cfg,
+                rec_buf=self._latency_rec_buf,
+                extra_record_seconds=0.02,
+            )
             
             # Send result via signal
             self.latency_signal.emit(result)
             
         except Exception as e:
-            print(f"Latency measurement error: {e}")
+            logger.exception("Latency measurement error: %s", e)
             # Send empty result to reset button
             self.latency_signal.emit({'error': str(e)})
     
@@ -762,28 +1080,19 @@ class SonarGUI(QtCore.QObject):
             return
         
         try:
+            # measure_latency only searches the direct-path window and rejects
+            # recordings below the noise floor, so the value is in range here.
             latency_s = result['latency_seconds']
             lag_samples = result['lag_samples']
-
-            # Sanity-check: if speaker isn't close, correlation may lock on an echo.
-            # Avoid overwriting good saved latency with an unrealistic value.
-            if not (0.0 <= float(latency_s) <= 0.02):
-                QtWidgets.QMessageBox.warning(
-                    self.win,
-                    "Latency Looks Wrong",
-                    f"Measured latency looks unrealistic: {latency_s*1000:.1f} ms\n\n"
-                    "Not saving this value.\n"
-                    "Tip: place speaker 1–5 cm from microphone and remeasure."
-                )
-                return
-            
-            # Update value in UI
-            self.latency_spin.setValue(latency_s)
             
-            # Save to configuration file
-            if settings.set_system_latency(latency_s):
-                config_file = settings.get_config_file_path()
-                print(f"System latency saved to {config_file}")
+            # Update value in UI and save to configuration file. The spinbox
+            # handler saves too; batch so init.json is written once.
+            with settings.batch_updates() as batch:
+                self.latency_spin.setValue(latency_s)
+                settings.set_system_latency(latency_s)
+            if batch.saved:
+                self.system_latency = latency_s
+                logger.info("System latency saved to %s", settings.get_config_file_path())
             
             # Show result
             QtWidgets.QMessageBox.information(
@@ -792,7 +1101,8 @@ class SonarGUI(QtCore.QObject):
                 f"System latency: {latency_s*1000:.3f} ms\n\n"
                 f"Lag: {lag_samples} samples\n"
                 f"Sample rate: {self.cfg.sample_rate} Hz\n\n"
-                "Value automatically updated in settings."
+                + ("Value automatically updated in settings." if batch.saved
+                   else "Could not save the value to the settings file.")
             )
             
         except Exception as e:
@@ -802,84 +1112,118 @@ class SonarGUI(QtCore.QObject):
                 f"Failed to process result:\n{e}"
             )
     
+    @QtCore.pyqtSlot(float)
     def _on_latency_changed(self, value: float):
         """Save latency value to config when manually changed."""
-        if settings.set_system_latency(value):
+        with settings.batch_updates() as batch:
+            settings.set_system_latency(value)
+        # saved is None inside an outer batch (measured latency being
+        # applied); that caller checks the write and updates the state.
+        if batch.saved:
             self.system_latency = value
-            print(f"✓ System latency updated: {value:.5f} s")
-            settings.set_gui_settings({"system_latency_s": float(value)})
+            logger.info("✓ System latency updated: %.5f s", value)
+
+
+    def _queue_setting(self, key: str, value):
+        """Schedule a GUI setting for persistence (debounced)."""
+        if self._persisted_settings.get(key) == value:
+            # Unchanged (or changed back) since last save: nothing to write
+            self._pending_settings.pop(key, None)
+            return
+        self._pending_settings[key] = value
+        self._save_timer.start()
+
+    def _save_setting_now(self, key: str, value):
+        """Persist a GUI setting immediately, skipping unchanged values."""
+        if self._persisted_settings.get(key) == value:
+            return
+        if settings.set_gui_settings({key: value}):
+            self._persisted_settings[key] = value
+
+    @QtCore.pyqtSlot()
+    def _flush_pending_settings(self):
+        """Write all pending GUI settings in a single save."""
+        self._save_timer.stop()
+        if not self._pending_settings:
+            return
+        pending = self._pending_settings
+        self._pending_settings = {}
+        if settings.set_gui_settings(pending):
+            self._persisted_settings.update(pending)
 
 
+    @QtCore.pyqtSlot(int)
     def _on_start_freq_changed(self, value: int):
         self.start_freq = float(value)
-        settings.set_gui_settings({"start_freq_hz": float(value)})
+        self._queue_setting("start_freq_hz", float(value))
 
 
+    @QtCore.pyqtSlot(int)
     def _on_end_freq_changed(self, value: int):
         self.end_freq = float(value)
-        settings.set_gui_settings({"end_freq_hz": float(value)})
+        self._queue_setting("end_freq_hz", float(value))
 
 
+    @QtCore.pyqtSlot(int)
     def _on_amplitude_changed(self, v: int):
         value = float(v) / 100.0
         self.amplitude_value_label.setText(f"{value:.2f}")
         self.amplitude = value
-        settings.set_gui_settings({"amplitude": value})
+        self._queue_setting("amplitude", value)
     
+    @QtCore.pyqtSlot(int)
     def _on_filter_changed(self, value: int):
         """Update filter size when changed."""
         self.filter_size = value
-        settings.set_gui_settings({"filter_size": int(value)})
+        self._queue_setting("filter_size", int(value))
         if value > 1:
             set_smoothing_buffer_size(value)
-            print(f"✓ Filter size changed: {value}")
+            logger.info("✓ Filter size changed: %d", value)
         elif value == 1:
-            print("✓ Filter: no smoothing (raw values)")
+            logger.info("✓ Filter: no smoothing (raw values)")
         else:
-            print("✓ Filter: OFF")
+            logger.info("✓ Filter: OFF")
     
+    @QtCore.pyqtSlot(int)
     def _on_normalize_changed(self, state: int):
         """Handle normalize checkbox change."""
         self.normalize_recorded = (state == QtCore.Qt.CheckState.Checked.value)
-        settings.set_gui_settings({"normalize_recorded": self.normalize_recorded})
+        self._save_setting_now("normalize_recorded", self.normalize_recorded)
         status = "enabled" if self.normalize_recorded else "disabled"
-        print(f"✓ Normalize recorded signal: {status}")
+        logger.info("✓ Normalize recorded signal: %s", status)
 
 
     def _refresh_echo_window(self):
         """Update echo window label and re-validate update rate."""
         medium = str(self.medium_combo.currentText())
         max_distance_m = float(self.max_distance_spin.value())
-        echo_s = compute_extra_record_seconds(medium=medium, max_distance_m=max_distance_m)
+        echo_s = _echo_s_cached(medium, max_distance_m)
+        self._echo_s = echo_s
         self.echo_window_label.setText(f"Echo Window: {echo_s*1000:.1f} ms")
         # Trigger validation of update rate against current duration + echo window
         self._on_duration_changed(float(self.duration_spin.value()))
 
 
+    @QtCore.pyqtSlot(str)
     def _on_medium_changed(self, _value: str):
-        settings.set_gui_settings({"medium": str(self.medium_combo.currentText())})
+        self._save_setting_now("medium", str(self.medium_combo.currentText()))
         self._refresh_echo_window()
 
 
+    @QtCore.pyqtSlot(float)
     def _on_max_distance_changed(self, _value: float):
         value = float(self.max_distance_spin.value())
         self.max_distance_m = value
-        try:
-            settings.set_max_distance(value)
-        except Exception as e:
-            print(f"Warning: failed to save max_distance_m: {e}")
-        settings.set_gui_settings({"max_distance_m": value})
+        self._queue_setting("max_distance_m", value)
         self._refresh_echo_window()
     
+    @QtCore.pyqtSlot(float)
     def _on_min_distance_changed(self, _value: float):
         value = float(self.min_distance_spin.value())
         self.min_distance_m = value
-        try:
-            settings.set_min_distance(value)
-        except Exception as e:
-            print(f"Warning: failed to save min_distance_m: {e}")
-        settings.set_gui_settings({"min_distance_m": value})
+        self._queue_setting("min_distance_m", value)
     
+    @QtCore.pyqtSlot(float)
     def _on_duration_changed(self, duration: float):
         """Validate duration vs update rate when duration changes.
 
@@ -887,27 +1231,25 @@ class SonarGUI(QtCore.QObject):
         I.e. update_rate <= 1 / (duration + echo_window).
         """
         self.duration = duration
-        settings.set_gui_settings({"chirp_duration_s": float(duration)})
+        self._queue_setting("chirp_duration_s", float(duration))
         if duration <= 0:
             return
 
-        medium = str(self.medium_combo.currentText())
-        max_distance_m = float(self.max_distance_spin.value())
-        echo_s = compute_extra_record_seconds(medium=medium, max_distance_m=max_distance_m)
+        echo_s = self._echo_s
         min_period = duration + echo_s
         max_update_rate = 1.0 / min_period
         current_update_rate = float(self.update_rate_spin.value())
         if current_update_rate > max_update_rate:
             safe_rate = min(self.update_rate_spin.maximum(), max_update_rate)
             safe_rate = round(safe_rate, 1)
-            self.update_rate_spin.blockSignals(True)
-            self.update_rate_spin.setValue(safe_rate)
-            self.update_rate_spin.blockSignals(False)
-            print(
-                f"⚠ Update rate adjusted to {safe_rate:.1f} Hz "
-                f"(min period {min_period:.3f}s = pulse {duration:.3f}s + echo {echo_s:.3f}s)"
+            with QtCore.QSignalBlocker(self.update_rate_spin):
+                self.update_rate_spin.setValue(safe_rate)
+            logger.info(
+                "⚠ Update rate adjusted to %.1f Hz (min period %.3fs = pulse %.3fs + echo %.3fs)",
+                safe_rate, min_period, duration, echo_s,
             )
 
+    @QtCore.pyqtSlot()
     def _optimize_duration(self):
         """Calculate optimal chirp duration based on distance and SNR requirements."""
         # Create dialog for input parameters
@@ -983,7 +1325,7 @@ class SonarGUI(QtCore.QObject):
             if reply == QtWidgets.QMessageBox.StandardButton.Yes:
                 # Update duration spinbox
                 self.duration_spin.setValue(optimal_duration)
-                print(f"✓ Optimal duration applied: {optimal_duration*1000:.1f} ms")
+                logger.info("✓ Optimal duration applied: %.1f ms", optimal_duration * 1000)
                 
         except Exception as e:
             QtWidgets.QMessageBox.critical(
@@ -992,6 +1334,7 @@ class SonarGUI(QtCore.QObject):
                 f"Failed to calculate optimal duration:\n{e}"
             )
     
+    @QtCore.pyqtSlot(float)
     def _on_update_rate_changed(self, update_rate: float):
         """Validate update rate vs duration when update rate changes.
 
@@ -1002,21 +1345,18 @@ class SonarGUI(QtCore.QObject):
         if duration <= 0:
             return
 
-        medium = str(self.medium_combo.currentText())
-        max_distance_m = float(self.max_distance_spin.value())
-        echo_s = compute_extra_record_seconds(medium=medium, max_distance_m=max_distance_m)
+        echo_s = self._echo_s
         min_period = duration + echo_s
         max_update_rate = 1.0 / min_period
         if update_rate > max_update_rate:
             safe_rate = min(self.update_rate_spin.maximum(), max_update_rate)
             safe_rate = round(safe_rate, 1)
-            self.update_rate_spin.blockSignals(True)
-            self.update_rate_spin.setValue(safe_rate)
-            self.update_rate_spin.blockSignals(False)
-            settings.set_gui_settings({"update_rate_hz": float(safe_rate)})
-            print(
-                f"⚠ Update rate too fast! Max {safe_rate:.1f} Hz "
-                f"(min period {min_period:.3f}s = pulse {duration:.3f}s + echo {echo_s:.3f}s)"
+            with QtCore.QSignalBlocker(self.update_rate_spin):
+                self.update_rate_spin.setValue(safe_rate)
+            self._queue_setting("update_rate_hz", float(safe_rate))
+            logger.info(
+                "⚠ Update rate too fast! Max %.1f Hz (min period %.3fs = pulse %.3fs + echo %.3fs)",
+                safe_rate, min_period, duration, echo_s,
             )
             QtWidgets.QMessageBox.warning(
                 self.win,
@@ -1028,7 +1368,7 @@ class SonarGUI(QtCore.QObject):
                 f"Min period = {min_period:.3f}s => max {max_update_rate:.1f} Hz"
             )
         else:
-            settings.set_gui_settings({"update_rate_hz": float(update_rate)})
+            self._queue_setting("update_rate_hz", float(update_rate))
     
     def run(self):
         """Run the application."""
@@ -1036,11 +1376,11 @@ class SonarGUI(QtCore.QObject):
             self.app.exec()
         finally:
             # Ensure clean shutdown
-            self.running = False
-            if self.measurement_thread and self.measurement_thread.is_alive():
-                self.measurement_thread.join(timeout=3.0)
-            # Clear all data to free memory
-            self._clear_history()
+            self._stop_worker()
+            # Persist any settings still waiting on the debounce timer
+            self._flush_pending_settings()
+            # Drop history references; no plot redraw after the event loop ended
+            self._drop_history()
             # Disconnect signals to prevent memory leaks
             try:
                 self.update_signal.disconnect()
@@ -1049,6 +1389,36 @@ class SonarGUI(QtCore.QObject):
                 pass
 
 
+def _show_standalone_warning():
+    """Ask for confirmation before running the GUI without Core echopi CLI.
+
+    Only called when a warning is requested, so CLI launches skip building
+    the dialog entirely. Exits the process unless the user confirms.
+    """
+    pg.mkQApp("EchoPi Sonar")
+    msg = QtWidgets.QMessageBox()
+    msg.setIcon(QtWidgets.QMessageBox.Icon.Warning)
+    msg.setWindowTitle("⚠️ Sonar GUI Running Without Core echopi")
+    msg.setText("This GUI is running in STANDALONE mode")
+    msg.setInformativeText(
+        "WARNING: This is a FRONTEND ONLY component!\n\n"
+        "All sonar computations are performed by Core echopi:\n"
+        "  • echopi.dsp.*           - Signal processing\n"
+        "  • echopi.utils.distance  - Distance measurements\n"
+        "  • echopi.utils.latency   - Latency compensation\n\n"
+        "This GUI should be launched via Core echopi CLI:\n"
+        "  echopi sonar            - Launch via CLI\n"
+        "  echopi sonar --gui      - Interactive GUI mode\n\n"
+        "Direct execution is for TESTING ONLY.\n"
+        "Continue anyway?"
+    )
+    msg.setStandardButtons(QtWidgets.QMessageBox.StandardButton.Yes | QtWidgets.QMessageBox.StandardButton.No)
+    msg.setDefaultButton(QtWidgets.QMessageBox.StandardButton.No)
+    
+    if msg.exec() != QtWidgets.QMessageBox.StandardButton.Yes:
+        sys.exit(0)
+
+
 def run_sonar_gui(
     cfg: AudioDeviceConfig,
     fullscreen: bool = False,
@@ -1068,34 +1438,13 @@ def run_sonar_gui(
     """
     
     if not _check_x11_display():
-        print("ERROR: No X11 display available!", file=sys.stderr)
+        print("ERROR: No X11 or Wayland display available!", file=sys.stderr)
         print("\nNo X11 server is running on this device.", file=sys.stderr)
         sys.exit(1)
     
     # Show warning if running directly (not via Core echopi CLI)
     if show_warning:
-        app = pg.mkQApp("EchoPi Sonar")
-        msg = QtWidgets.QMessageBox()
-        msg.setIcon(QtWidgets.QMessageBox.Icon.Warning)
-        msg.setWindowTitle("⚠️ Sonar GUI Running Without Core echopi")
-        msg.setText("This GUI is running in STANDALONE mode")
-        msg.setInformativeText(
-            "WARNING: This is a FRONTEND ONLY component!\n\n"
-            "All sonar computations are performed by Core echopi:\n"
-            "  • echopi.dsp.*           - Signal processing\n"
-            "  • echopi.utils.distance  - Distance measurements\n"
-            "  • echopi.utils.latency   - Latency compensation\n\n"
-            "This GUI should be launched via Core echopi CLI:\n"
-            "  echopi sonar            - Launch via CLI\n"
-            "  echopi sonar --gui      - Interactive GUI mode\n\n"
-            "Direct execution is for TESTING ONLY.\n"
-            "Continue anyway?"
-        )
-        msg.setStandardButtons(QtWidgets.QMessageBox.StandardButton.Yes | QtWidgets.QMessageBox.StandardButton.No)
-        msg.setDefaultButton(QtWidgets.QMessageBox.StandardButton.No)
-        
-        if msg.exec() != QtWidgets.QMessageBox.StandardButton.Yes:
-            sys.exit(0)
+        _show_standalone_warning()
     
     gui = SonarGUI(cfg, fullscreen=fullscreen, max_distance_m=max_distance_m)
     gui.run()
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import atexit
 import contextlib
+import functools
 import time
 import threading
-from typing import Iterable
+from collections import OrderedDict
+from typing import Iterable, NamedTuple
 
 import numpy as np
 import sounddevice as sd
@@ -24,6 +26,54 @@ def _cfg_signature(cfg: AudioDeviceConfig) -> tuple:
     )
 
 
+def _wait_until(predicate, timeout_s: float):
+    """Poll predicate() every 1 ms until true or timeout_s elapses."""
+    t0 = time.monotonic()
+    while not predicate() and time.monotonic() - t0 < timeout_s:
+        time.sleep(0.001)
+
+
+class _JobLayout(NamedTuple):
+    """Frame offsets of one play+record job (priming + signal + tail)."""
+
+    priming_frames: int
+    signal_end: int
+    total_frames: int
+    total_with_priming: int
+
+
+@functools.lru_cache(maxsize=8)
+def _job_layout(n_play: int, extra_frames: int, priming_blocks: int, blocksize: int) -> _JobLayout:
+    priming_frames = blocksize * priming_blocks
+    total_frames = n_play + extra_frames
+    return _JobLayout(
+        priming_frames=priming_frames,
+        signal_end=priming_frames + n_play,
+        total_frames=total_frames,
+        total_with_priming=priming_frames + total_frames,
+    )
+
+
+# _JobSlot.state values
+_JOB_IDLE = 0
+_JOB_RUNNING = 1
+_JOB_DONE = 2
+
+
+class _JobSlot:
+    """The single play+record job shared with the audio callback."""
+
+    __slots__ = ("play", "rec", "idx", "total", "state", "had_xrun")
+
+    def __init__(self):
+        self.play: np.ndarray | None = None
+        self.rec: np.ndarray | None = None
+        self.idx = 0
+        self.total = 0
+        self.state = _JOB_IDLE
+        self.had_xrun = False
+
+
 class PersistentAudioStream:
     """Persistent duplex stream for stable repeated play+record calls.
 
@@ -35,17 +85,34 @@ class PersistentAudioStream:
         self.cfg = cfg
         self.stream: sd.Stream | None = None
         self._next_allowed_time = 0.0
+        # Single-producer/single-consumer handoff, no lock in the callback:
+        # play_and_record fills the job slot and sets state=RUNNING last; the
+        # callback sets state=DONE, then the event (attribute stores are
+        # atomic under the GIL). Slot and event are reused for every job.
+        # _job_lock keeps it single-producer: held by play_and_record for the
+        # whole job, including its writes to the scratch buffers.
+        self._slot = _JobSlot()
+        self._done = threading.Event()
         self._job_lock = threading.Lock()
-        self._job: dict | None = None
         self._jobs_run = 0
+        # Set when a job saw an xrun; the next open/close cycle then keeps the
+        # fixed driver settle delays
+        self._had_recent_xrun = False
+        # Scratch buffers reused across jobs (grown, never shrunk). Playback
+        # is (frames, channels_play) so the callback copies blocks as-is.
+        self._play_buf = np.empty((0, 1), dtype=np.float32)
+        self._rec_buf = np.empty(0, dtype=np.float32)
+        # _JobLayout whose silent regions are currently zeroed in _play_buf
+        self._play_layout: _JobLayout | None = None
         self._create_stream()
 
     def _create_stream(self):
         if self.stream is not None:
             self.close()
 
-        # Small delay helps some drivers stabilize.
-        time.sleep(0.05)
+        # Small delay helps some drivers stabilize after trouble.
+        if self._had_recent_xrun:
+            time.sleep(0.05)
         self.stream = sd.Stream(
             samplerate=self.cfg.sample_rate,
             blocksize=self.cfg.frames_per_buffer,
@@ -56,61 +123,94 @@ class PersistentAudioStream:
             callback=self._callback,
         )
         self.stream.start()
-        time.sleep(0.05)
+        if self._had_recent_xrun:
+            time.sleep(0.05)
+            self._had_recent_xrun = False
+        else:
+            _wait_until(lambda: self.stream.active, 0.05)
         self._jobs_run = 0
 
     def _callback(self, indata, outdata, frames, time_info, status):  # noqa: ANN001
-        # Keep callback lean; no logging.
-        with self._job_lock:
-            job = self._job
+        # Keep callback lean; no logging, no locks.
+        job = self._slot
 
-        if job is None:
+        if job.state != _JOB_RUNNING:
             outdata[:] = 0
             return
 
         if status:
-            job["had_xrun"] = True
+            job.had_xrun = True
+
+        # play is already (frames, channels_play): plain block copies. All
+        # buffers are float32, so copyto(casting="no") skips dtype resolution.
+        idx = job.idx
+        end = idx + frames
+        total = job.total
+        if end < total:
+            # Fast path: every block but the last is a full block
+            np.copyto(outdata, job.play[idx:end], casting="no")
+            np.copyto(job.rec[idx:end], indata[:, 0], casting="no")
+            job.idx = end
+            return
 
-        idx = job["idx"]
-        total = job["total"]
-        end = min(idx + frames, total)
+        # Last block: partial copy, zero the rest, finish the job
+        end = total
         n = end - idx
-
-        # Output
-        out_ch = job["out_ch"]
         if n > 0:
-            chunk = job["play"][idx:end]
-            if out_ch == 1:
-                outdata[:n, 0] = chunk
-            else:
-                outdata[:n, :] = chunk.reshape(-1, 1)
+            np.copyto(outdata[:n], job.play[idx:end], casting="no")
             if n < frames:
-                outdata[n:, :] = 0
+                outdata[n:] = 0
+            np.copyto(job.rec[idx:end], indata[:n, 0], casting="no")
         else:
             outdata[:] = 0
 
-        # Input
-        if n > 0:
-            job["rec"][idx:end] = indata[:n, 0]
+        job.idx = end
+        # Mark done before signalling so the next job can be published
+        job.state = _JOB_DONE
+        self._done.set()
 
-        job["idx"] = end
-        if end >= total:
-            job["done"].set()
-            with self._job_lock:
-                self._job = None
+    def _abort_stream(self):
+        """Drop the stream without draining it.
+
+        No callback is running once abort() has returned, so the job slot
+        and scratch buffers can be reused afterwards.
+        """
+        if self.stream is None:
+            return
+        try:
+            self.stream.abort()
+            self.stream.close()
+        finally:
+            self.stream = None
+            # Driver trouble: keep the settle delays when reopening
+            self._had_recent_xrun = True
 
     def close(self):
         if self.stream is None:
             return
         try:
             self.stream.stop()
-            time.sleep(0.05)
+            if self._had_recent_xrun:
+                time.sleep(0.05)
+            else:
+                _wait_until(lambda: self.stream.stopped, 0.05)
             self.stream.close()
-            time.sleep(0.05)
+            if self._had_recent_xrun:
+                time.sleep(0.05)
         finally:
             self.stream = None
 
     def play_and_record(self, play_signal: np.ndarray, extra_record_seconds: float = 0.1) -> np.ndarray:
+        # Checked before anything is written: a second caller must not
+        # touch the scratch buffers the running job plays from
+        if not self._job_lock.acquire(blocking=False):
+            raise RuntimeError("Audio stream is busy")
+        try:
+            return self._play_and_record(play_signal, extra_record_seconds)
+        finally:
+            self._job_lock.release()
+
+    def _play_and_record(self, play_signal: np.ndarray, extra_record_seconds: float) -> np.ndarray:
         if self.stream is None:
             self._create_stream()
 
@@ -127,54 +227,63 @@ class PersistentAudioStream:
             raise ValueError(f"channels_play must be >= 1, got {out_ch}")
 
         play_signal = np.asarray(play_signal, dtype=np.float32)
-        extra_frames = int(extra_record_seconds * self.cfg.sample_rate)
-        total_frames = int(play_signal.shape[0]) + extra_frames
-
         # Priming: prepend silent blocks and trim them from the returned
         # recording. This flushes stale buffered samples without shifting the
         # time origin of play_signal.
         # Always use 3 blocks for voiceHAT stability (prevents amplitude drift)
-        priming_blocks = 3
-        priming_frames = int(self.cfg.frames_per_buffer) * int(priming_blocks)
-        play_buf = np.concatenate(
-            [
-                np.zeros(priming_frames, dtype=np.float32),
-                play_signal,
-                np.zeros(extra_frames, dtype=np.float32),
-            ]
+        layout = _job_layout(
+            int(play_signal.shape[0]),
+            int(extra_record_seconds * self.cfg.sample_rate),
+            3,
+            int(self.cfg.frames_per_buffer),
         )
-        total_with_priming = int(play_buf.shape[0])
+        priming_frames = layout.priming_frames
+        total_frames = layout.total_frames
+        total_with_priming = layout.total_with_priming
+        if self._rec_buf.size < total_with_priming or self._play_buf.shape[1] != out_ch:
+            # Headroom so small increases (e.g. a longer chirp) don't reallocate
+            capacity = int(total_with_priming * 1.5)
+            self._play_buf = np.empty((capacity, out_ch), dtype=np.float32)
+            self._rec_buf = np.empty(capacity, dtype=np.float32)
+            self._play_layout = None
+        play_buf = self._play_buf[:total_with_priming]
+        if layout != self._play_layout:
+            # Silent regions only change with the layout
+            play_buf[:priming_frames] = 0.0
+            play_buf[layout.signal_end:] = 0.0
+            self._play_layout = layout
+        # Mono signal broadcast to every output channel once, here
+        play_buf[priming_frames:layout.signal_end] = play_signal[:, None]
+        # Every frame is written by the callback before the job completes
+        recorded_full = self._rec_buf[:total_with_priming]
 
         # One retry on xrun helps stability under load.
         for attempt in range(2):
-            recorded_full = np.zeros(total_with_priming, dtype=np.float32)
-            done = threading.Event()
-            job = {
-                "play": play_buf,
-                "rec": recorded_full,
-                "idx": 0,
-                "total": total_with_priming,
-                "done": done,
-                "out_ch": out_ch,
-                "had_xrun": False,
-            }
-
-            with self._job_lock:
-                if self._job is not None:
-                    raise RuntimeError("Audio stream is busy")
-                self._job = job
+            job = self._slot
+            job.play = play_buf
+            job.rec = recorded_full
+            job.idx = 0
+            job.total = total_with_priming
+            job.had_xrun = False
+            self._done.clear()
+            job.state = _JOB_RUNNING  # publish last
 
             timeout_s = (total_with_priming / float(self.cfg.sample_rate)) + 1.0
-            if not done.wait(timeout=timeout_s):
-                with self._job_lock:
-                    self._job = None
+            if not self._done.wait(timeout=timeout_s):
+                # The callback may still be inside this job; stop it before
+                # the slot is marked idle (the next call reopens the stream)
+                self._abort_stream()
+                job.state = _JOB_IDLE
                 raise TimeoutError("Timed out waiting for audio stream")
 
-            had_xrun = bool(job.get("had_xrun"))
+            had_xrun = job.had_xrun
+            if had_xrun:
+                self._had_recent_xrun = True
             if (not had_xrun) or attempt == 1:
+                # Copy out: the scratch buffer is reused by the next job
                 recorded = recorded_full[
                     priming_frames:priming_frames + total_frames
-                ]
+                ].copy()
                 # Longer cooldown for voiceHAT stability (prevents amplitude drift)
                 cooldown_s = 0.020
                 self._next_allowed_time = time.monotonic() + cooldown_s
@@ -187,40 +296,53 @@ class PersistentAudioStream:
         raise RuntimeError("Unreachable")
 
 
-_global_stream: PersistentAudioStream | None = None
-_global_signature: tuple | None = None
+# Open streams keyed by _cfg_signature, least recently used first. Switching
+# back to a recent config reuses its stream instead of a close/reopen cycle.
+_MAX_STREAMS = 2
+_stream_cache: OrderedDict[tuple, PersistentAudioStream] = OrderedDict()
 
 
 def get_global_stream(cfg: AudioDeviceConfig) -> PersistentAudioStream:
-    global _global_stream, _global_signature
     sig = _cfg_signature(cfg)
-    if _global_stream is None or _global_signature != sig:
-        if _global_stream is not None:
-            try:
-                _global_stream.close()
-            except Exception:
-                pass
-        _global_stream = PersistentAudioStream(cfg)
-        _global_signature = sig
-    return _global_stream
+    stream = _stream_cache.get(sig)
+    if stream is not None:
+        _stream_cache.move_to_end(sig)
+        return stream
+
+    try:
+        stream = PersistentAudioStream(cfg)
+    except Exception:
+        if not _stream_cache:
+            raise
+        # Device may not allow a second open stream: release cached ones and retry
+        close_global_stream()
+        stream = PersistentAudioStream(cfg)
+    _stream_cache[sig] = stream
+
+    while len(_stream_cache) > _MAX_STREAMS:
+        _, old = _stream_cache.popitem(last=False)
+        try:
+            old.close()
+        except Exception:
+            pass
+    return stream
 
 
 def close_global_stream():
-    global _global_stream, _global_signature
-    if _global_stream is not None:
+    while _stream_cache:
+        _, stream = _stream_cache.popitem(last=False)
         try:
-            _global_stream.close()
-        finally:
-            _global_stream = None
-            _global_signature = None
+            stream.close()
+        except Exception:
+            pass
 
 
 atexit.register(close_global_stream)
 
 
 def list_devices() -> list[dict]:
-    devices = sd.query_devices()
-    return [dict(d) for d in devices]
+    # query_devices() already builds a fresh dict per device; no need to copy
+    return list(sd.query_devices())
 
 
 def default_devices() -> dict:
@@ -252,11 +374,22 @@ def play_blocking(signal: np.ndarray, cfg: AudioDeviceConfig):
     sd.play(signal, samplerate=cfg.sample_rate, device=cfg.play_device, blocking=True)
 
 
+# (frames, channels_rec) capture buffer reused by record_blocking()
+_rec_scratch: np.ndarray | None = None
+
+
 def record_blocking(duration: float, cfg: AudioDeviceConfig) -> np.ndarray:
+    global _rec_scratch
     frames = int(duration * cfg.sample_rate)
-    data = sd.rec(frames, samplerate=cfg.sample_rate, channels=cfg.channels_rec, device=cfg.rec_device, dtype="float32")
+    buf = _rec_scratch
+    if buf is None or buf.shape[0] < frames or buf.shape[1] != cfg.channels_rec:
+        buf = np.empty((frames, cfg.channels_rec), dtype=np.float32)
+        _rec_scratch = buf
+    data = buf[:frames]
+    sd.rec(frames, samplerate=cfg.sample_rate, channels=cfg.channels_rec, device=cfg.rec_device, dtype="float32", out=data)
     sd.wait()
-    return data[:, 0]
+    # Compact copy of channel 0: the caller doesn't pin the multi-channel buffer
+    return data[:, 0].copy()
 
 
 def monitor_microphone(cfg: AudioDeviceConfig, callback):
@@ -329,7 +462,11 @@ def play_and_record(play_signal: np.ndarray, cfg: AudioDeviceConfig, extra_recor
 
 
 def rms_level(samples: Iterable[float]) -> float:
-    arr = np.asarray(list(samples), dtype=np.float32)
+    if isinstance(samples, np.ndarray):
+        arr = samples.astype(np.float32, copy=False).ravel()
+    else:
+        arr = np.fromiter(samples, dtype=np.float32)
     if arr.size == 0:
         return 0.0
-    return float(np.sqrt(np.mean(arr ** 2)))
+    # dot() reduces without a squared temporary
+    return float(np.sqrt(arr.dot(arr) / arr.size))
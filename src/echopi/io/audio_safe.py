@@ -28,6 +28,11 @@ class PersistentAudioStream:
 
     Instead of creating a new stream for each measurement,
     create one stream and reuse it.
+
+    Distance and latency measurements use this blocking write/read stream,
+    not the callback stream in echopi.io.audio. The two have different
+    input/output alignment, and the calibrated system latency (and the
+    3 ms direct-path window in measure_latency) is only valid for this one.
     """
     
     def __init__(self, cfg: AudioDeviceConfig):
@@ -35,6 +40,11 @@ class PersistentAudioStream:
         self.stream = None
         self._next_allowed_time = 0.0
         self._primed = False
+        # Playback buffer reused across calls: play_signal zero-padded to whole
+        # blocks, shaped (frames, channels_play) as the stream expects
+        self._play_buf = np.empty((0, cfg.channels_play), dtype=np.float32)
+        # Recording scratch handed out by record_buffer()
+        self._rec_scratch = np.empty(0, dtype=np.float32)
         self._create_stream()
     
     def _create_stream(self):
@@ -76,11 +86,23 @@ class PersistentAudioStream:
             finally:
                 self.stream = None
     
+    def record_buffer(self, n_samples: int) -> np.ndarray:
+        """Reusable float32 buffer of at least n_samples for play_and_record(out=...).
+
+        The same buffer is returned on every call (regrown with headroom when
+        too small), so a recording made into it is only valid until the next
+        measurement that uses it.
+        """
+        if self._rec_scratch.size < n_samples:
+            self._rec_scratch = np.empty(int(n_samples * 1.5), dtype=np.float32)
+        return self._rec_scratch
+
     def play_and_record(
         self, 
         play_signal: np.ndarray, 
         extra_record_seconds: float = 0.1,
-        return_tx_index: bool = True
+        return_tx_index: bool = True,
+        out: np.ndarray | None = None,
     ) -> tuple[np.ndarray, int] | np.ndarray:
         """Playback and recording using persistent stream.
 
@@ -91,6 +113,9 @@ class PersistentAudioStream:
             play_signal: Signal for playback (TX chirp)
             extra_record_seconds: Additional recording time after TX
             return_tx_index: If True, return (recorded, tx_sample_index)
+            out: Optional preallocated float32 buffer to record into. Must hold
+                len(play_signal) + extra_record_seconds * sample_rate samples;
+                recorded is then a view of its head (no allocation per call).
 
         Returns:
             If return_tx_index=True: (recorded, tx_sample_index)
@@ -112,9 +137,11 @@ class PersistentAudioStream:
         # Use 3 blocks for voiceHAT stability
         if not self._primed:
             try:
-                zeros = np.zeros(self.cfg.frames_per_buffer, dtype=np.float32)
+                zeros = np.zeros(
+                    (self.cfg.frames_per_buffer, self.cfg.channels_play), dtype=np.float32
+                )
                 for _ in range(3):  # 3 priming blocks instead of 1
-                    self.stream.write(zeros.reshape(-1, 1))
+                    self.stream.write(zeros)
                     self.stream.read(self.cfg.frames_per_buffer)
                     time.sleep(0.01)  # Small delay between priming blocks
             except Exception as e:
@@ -122,7 +149,15 @@ class PersistentAudioStream:
             self._primed = True
         
         total_frames = len(play_signal) + int(extra_record_seconds * self.cfg.sample_rate)
-        recorded = np.zeros(total_frames, dtype=np.float32)
+        # Every sample is overwritten by the read loop below
+        if out is None:
+            recorded = np.empty(total_frames, dtype=np.float32)
+        else:
+            if out.dtype != np.float32:
+                raise ValueError(f"out buffer must be float32, got {out.dtype}")
+            if len(out) < total_frames:
+                raise ValueError(f"out buffer too small: {len(out)} < {total_frames} samples")
+            recorded = out[:total_frames]
 
         # Enforce a minimum real-time cycle based on stream blocksize.
         blocks = max(1, int(np.ceil(total_frames / self.cfg.frames_per_buffer)))
@@ -136,21 +171,27 @@ class PersistentAudioStream:
         # Account for priming delay - after priming first write starts TX.
         tx_sample_index = 0  # TX chirp starts at index 0 in recorded
         
+        # Pad once up front; the loop below only slices views
+        frames = self.cfg.frames_per_buffer
+        padded_frames = blocks * frames
+        if self._play_buf.shape[0] < padded_frames:
+            self._play_buf = np.empty(
+                (padded_frames, self.cfg.channels_play), dtype=np.float32
+            )
+        play_buf = self._play_buf[:padded_frames]
+        n_play = len(play_signal)
+        # Mono signal broadcast to every output channel
+        play_buf[:n_play] = np.reshape(play_signal, (-1, 1))
+        play_buf[n_play:] = 0.0
+        
         try:
-            idx = 0
-            while idx < total_frames:
-                chunk_out = play_signal[idx:idx + self.cfg.frames_per_buffer]
-                if len(chunk_out) < self.cfg.frames_per_buffer:
-                    chunk_out = np.pad(
-                        chunk_out, 
-                        (0, self.cfg.frames_per_buffer - len(chunk_out))
-                    )
-                
-                self.stream.write(chunk_out.reshape(-1, 1))
-                in_chunk, _ = self.stream.read(self.cfg.frames_per_buffer)
-                end = min(idx + self.cfg.frames_per_buffer, total_frames)
+            # Interleave write/read per block: one large blocking write would
+            # let the input side overflow while it waits
+            for idx in range(0, padded_frames, frames):
+                self.stream.write(play_buf[idx:idx + frames])
+                in_chunk, _ = self.stream.read(frames)
+                end = min(idx + frames, total_frames)
                 recorded[idx:end] = in_chunk[: end - idx, 0]
-                idx += self.cfg.frames_per_buffer
 
             # If the loop returned faster than real-time (unexpected buffering), slow down.
             elapsed = time.monotonic() - start_t
@@ -5,8 +5,13 @@ Handles loading and saving persistent settings like system latency.
 from __future__ import annotations
 
 import json
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping
 
 
 # Default configuration directory
@@ -31,76 +36,165 @@ DEFAULT_SETTINGS = {
 }
 
 
+# Settings read and written by the GUI, with their defaults
+_GUI_DEFAULTS = {
+    "start_freq_hz": DEFAULT_SETTINGS["start_freq_hz"],
+    "end_freq_hz": DEFAULT_SETTINGS["end_freq_hz"],
+    "chirp_duration_s": DEFAULT_SETTINGS["chirp_duration_s"],
+    "amplitude": DEFAULT_SETTINGS["amplitude"],
+    "medium": DEFAULT_SETTINGS["medium"],
+    "update_rate_hz": DEFAULT_SETTINGS["update_rate_hz"],
+    "filter_size": DEFAULT_SETTINGS["filter_size"],
+    "normalize_recorded": False,
+    "min_distance_m": DEFAULT_SETTINGS["min_distance_m"],
+    "max_distance_m": DEFAULT_SETTINGS["max_distance_m"],
+    "system_latency_s": DEFAULT_SETTINGS["system_latency_s"],
+}
+
+
+# Per-thread deferred writes collected inside batch_updates()
+_batch_state = threading.local()
+
+# Parsed init.json (merged with defaults), keyed by (mtime_ns, size)
+_cache: dict[str, Any] | None = None
+_cache_key: tuple[int, int] | None = None
+_cache_lock = threading.Lock()
+
+# Set once ensure_config_dir() has created CONFIG_DIR
+_dir_ready = False
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a batch_updates() block.
+
+    saved is None while the deferred write is still pending (always the case
+    inside the block, and after a nested block), then True/False once the
+    outermost block has exited and written init.json.
+    """
+    saved: bool | None = None
+
+
+@contextmanager
+def batch_updates() -> Iterator[BatchResult]:
+    """Defer settings writes until the outermost block exits.
+
+    All save_settings() calls inside the block (including set_gui_settings,
+    set_system_latency, ...) are merged and written to init.json once.
+    Reads inside the block see the deferred values. Nesting is allowed.
+
+    Setters called inside the block return True without writing; check the
+    yielded BatchResult after the block to learn whether the write succeeded.
+    A nested block yields the outer block's result, which is still pending
+    when the nested block exits.
+    """
+    outer = getattr(_batch_state, "result", None)
+    if outer is not None:
+        yield outer
+        return
+    result = BatchResult()
+    _batch_state.pending = {}
+    _batch_state.result = result
+    try:
+        yield result
+    finally:
+        pending = _batch_state.pending
+        _batch_state.pending = None
+        _batch_state.result = None
+        result.saved = save_settings(pending) if pending else True
+
+
 def _get_value(key: str, default: Any) -> Any:
-    settings = load_settings()
-    return settings.get(key, default)
+    return _settings_view().get(key, default)
+
+
+def get_all_settings() -> Mapping[str, Any]:
+    """Return all settings (merged with defaults) as a read-only mapping.
+
+    One cached read; use this instead of several get_* calls in a row.
+    """
+    return MappingProxyType(_settings_view())
 
 
 def get_gui_settings() -> dict[str, Any]:
     """Return GUI-related settings (merged with defaults)."""
-    s = load_settings()
-    return {
-        "start_freq_hz": s.get("start_freq_hz", DEFAULT_SETTINGS["start_freq_hz"]),
-        "end_freq_hz": s.get("end_freq_hz", DEFAULT_SETTINGS["end_freq_hz"]),
-        "chirp_duration_s": s.get("chirp_duration_s", DEFAULT_SETTINGS["chirp_duration_s"]),
-        "amplitude": s.get("amplitude", DEFAULT_SETTINGS["amplitude"]),
-        "medium": s.get("medium", DEFAULT_SETTINGS["medium"]),
-        "update_rate_hz": s.get("update_rate_hz", DEFAULT_SETTINGS["update_rate_hz"]),
-        "filter_size": s.get("filter_size", DEFAULT_SETTINGS["filter_size"]),
-        "normalize_recorded": s.get("normalize_recorded", False),
-        "min_distance_m": s.get("min_distance_m", DEFAULT_SETTINGS["min_distance_m"]),
-        "max_distance_m": s.get("max_distance_m", DEFAULT_SETTINGS["max_distance_m"]),
-        "system_latency_s": s.get("system_latency_s", DEFAULT_SETTINGS["system_latency_s"]),
-    }
+    s = _settings_view()
+    return {k: s.get(k, default) for k, default in _GUI_DEFAULTS.items()}
 
 
 def set_gui_settings(values: dict[str, Any]) -> bool:
     """Save a subset of GUI-related settings."""
-    allowed = {
-        "start_freq_hz",
-        "end_freq_hz",
-        "chirp_duration_s",
-        "amplitude",
-        "medium",
-        "update_rate_hz",
-        "filter_size",
-        "normalize_recorded",
-        "max_distance_m",
-        "system_latency_s",
-    }
-    payload = {k: v for k, v in values.items() if k in allowed}
+    payload = {k: v for k, v in values.items() if k in _GUI_DEFAULTS}
     if not payload:
         return True
     return save_settings(payload)
 
 
 def ensure_config_dir():
-    """Ensure configuration directory exists."""
+    """Ensure configuration directory exists (mkdir once per process)."""
+    global _dir_ready
+    if _dir_ready:
+        return
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    _dir_ready = True
+
+
+def _settings_view() -> Mapping[str, Any]:
+    """Merged settings without a defensive copy; callers must not modify it.
+
+    The parsed file is cached and re-read only when its mtime or size
+    changes. A reload replaces the cached dict instead of mutating it, so a
+    returned view stays a consistent snapshot.
+    """
+    global _cache, _cache_key
+    pending = getattr(_batch_state, "pending", None)
+    try:
+        st = CONFIG_FILE.stat()
+    except FileNotFoundError:
+        base = DEFAULT_SETTINGS
+    except OSError as e:
+        print(f"Warning: Failed to load config from {CONFIG_FILE}: {e}")
+        print("Using default settings")
+        return DEFAULT_SETTINGS
+    else:
+        key = (st.st_mtime_ns, st.st_size)
+        with _cache_lock:
+            if _cache is None or _cache_key != key:
+                try:
+                    with open(CONFIG_FILE, 'r') as f:
+                        settings = json.load(f)
+                except (json.JSONDecodeError, IOError) as e:
+                    print(f"Warning: Failed to load config from {CONFIG_FILE}: {e}")
+                    print("Using default settings")
+                    return DEFAULT_SETTINGS
+                
+                # Merge with defaults to ensure all keys exist
+                merged = DEFAULT_SETTINGS.copy()
+                merged.update(settings)
+                _cache = merged
+                _cache_key = key
+            base = _cache
+    
+    if pending:
+        return {**base, **pending}
+    return base
 
 
 def load_settings() -> dict[str, Any]:
     """Load settings from init.json file.
     
     Returns:
-        Dictionary with settings. If file doesn't exist, returns defaults.
+        Dictionary with settings (a copy the caller may modify).
+        If file doesn't exist, returns defaults.
     """
-    if not CONFIG_FILE.exists():
-        return DEFAULT_SETTINGS.copy()
-    
-    try:
-        with open(CONFIG_FILE, 'r') as f:
-            settings = json.load(f)
-        
-        # Merge with defaults to ensure all keys exist
-        result = DEFAULT_SETTINGS.copy()
-        result.update(settings)
-        return result
-        
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Warning: Failed to load config from {CONFIG_FILE}: {e}")
-        print("Using default settings")
-        return DEFAULT_SETTINGS.copy()
+    return dict(_settings_view())
+
+
+def _invalidate_cache():
+    global _cache, _cache_key
+    with _cache_lock:
+        _cache = None
+        _cache_key = None
 
 
 def save_settings(settings: dict[str, Any]) -> bool:
@@ -112,6 +206,13 @@ def save_settings(settings: dict[str, Any]) -> bool:
     Returns:
         True if successful, False otherwise
     """
+    global _dir_ready
+    pending = getattr(_batch_state, "pending", None)
+    if pending is not None:
+        # Inside batch_updates(): written once when the batch exits
+        pending.update(settings)
+        return True
+
     try:
         ensure_config_dir()
         
@@ -119,13 +220,18 @@ def save_settings(settings: dict[str, Any]) -> bool:
         current = load_settings()
         current.update(settings)
         
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(current, f, indent=2)
+        # Write a sibling temp file and rename it over init.json, so a crash
+        # mid-write never leaves a truncated config behind
+        tmp = CONFIG_FILE.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(current, indent=2))
+        os.replace(tmp, CONFIG_FILE)
+        _invalidate_cache()
         
         print(f"Settings saved to {CONFIG_FILE}")
         return True
         
     except (IOError, OSError) as e:
+        _dir_ready = False  # e.g. directory removed meanwhile: mkdir again next time
         print(f"Error: Failed to save config to {CONFIG_FILE}: {e}")
         return False
 
@@ -139,8 +245,8 @@ def get_system_latency(verbose: bool = False) -> float:
     Returns:
         System latency in seconds (from init.json if exists, otherwise default)
     """
-    settings = load_settings()
-    latency = settings.get("system_latency_s", DEFAULT_SETTINGS["system_latency_s"])
+    settings = _settings_view()
+    latency = float(settings.get("system_latency_s", DEFAULT_SETTINGS["system_latency_s"]))
     
     if verbose:
         if CONFIG_FILE.exists():
@@ -165,7 +271,7 @@ def set_system_latency(latency_s: float) -> bool:
 
 def get_max_distance(verbose: bool = False) -> float:
     """Get max distance (meters) used to size echo record window."""
-    settings = load_settings()
+    settings = _settings_view()
     value = settings.get("max_distance_m", DEFAULT_SETTINGS["max_distance_m"])
     try:
         value_f = float(value)
@@ -194,7 +300,7 @@ def set_max_distance(max_distance_m: float) -> bool:
 
 def get_min_distance(verbose: bool = False) -> float:
     """Get min distance (meters) used to filter close reflections."""
-    settings = load_settings()
+    settings = _settings_view()
     value = settings.get("min_distance_m", DEFAULT_SETTINGS["min_distance_m"])
     try:
         value_f = float(value)
@@ -223,17 +329,17 @@ def set_min_distance(min_distance_m: float) -> bool:
 
 def get_start_freq() -> float:
     """Get start frequency (Hz) from config."""
-    return _get_value("start_freq_hz", DEFAULT_SETTINGS["start_freq_hz"])
+    return float(_get_value("start_freq_hz", DEFAULT_SETTINGS["start_freq_hz"]))
 
 
 def get_end_freq() -> float:
     """Get end frequency (Hz) from config."""
-    return _get_value("end_freq_hz", DEFAULT_SETTINGS["end_freq_hz"])
+    return float(_get_value("end_freq_hz", DEFAULT_SETTINGS["end_freq_hz"]))
 
 
 def get_amplitude() -> float:
     """Get amplitude (0-1) from config."""
-    return _get_value("amplitude", DEFAULT_SETTINGS["amplitude"])
+    return float(_get_value("amplitude", DEFAULT_SETTINGS["amplitude"]))
 
 
 def get_config_file_path() -> Path:
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import numpy as np
-from collections import deque
+from dataclasses import dataclass, replace
 from functools import lru_cache
+from typing import NamedTuple
 
+from echopi import settings
 from echopi.config import AudioDeviceConfig, ChirpConfig
 from echopi.dsp.chirp import generate_chirp, normalize
-from echopi.dsp.correlation import cross_correlation, parabolic_interpolate, find_peaks
+from echopi.dsp.correlation import cross_correlation, parabolic_interpolate, reference_spectrum
 from echopi.io.audio_safe import get_global_stream
 
 
@@ -17,11 +19,64 @@ SPEED_OF_SOUND = {
 }
 
 
-# Global smoothing buffer for distance measurements
-_distance_smoothing_buffer = deque(maxlen=3)
+# The correlation reference is always windowed (reduces sidelobes); smaller
+# reference_fade values, including 0, are raised to this
+MIN_REFERENCE_FADE = 0.05
+
+
+# Fallback for unknown media, bound once so lookups need a single dict access
+_SPEED_AIR = SPEED_OF_SOUND["air"]
+
+
+def _sound_speed(medium: str) -> float:
+    """Speed of sound for medium; unknown media fall back to air."""
+    return SPEED_OF_SOUND.get(medium, _SPEED_AIR)
+
+
+class _RunningMean:
+    """Fixed-size moving average with an O(1) running sum.
+
+    Ring buffer of the last `size` values; append() subtracts the value
+    that falls out of the window instead of re-summing the whole buffer.
+    """
+
+    __slots__ = ("buf", "head", "size", "sum", "count")
+
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self.buf = [0.0] * self.size
+        self.head = 0
+        self.sum = 0.0
+        self.count = 0
+
+    def append(self, value: float) -> float:
+        """Add a value and return the mean of the current window."""
+        if self.count == self.size:
+            self.sum -= self.buf[self.head]
+        else:
+            self.count += 1
+        self.buf[self.head] = value
+        self.sum += value
+        self.head = (self.head + 1) % self.size
+        if self.head == 0 and self.count == self.size:
+            # Re-sum once per lap so add/subtract rounding can't accumulate
+            # over long sessions (amortized O(1))
+            self.sum = sum(self.buf)
+        return self.sum / self.count
 
-# Cache for generated chirps (for amplitude stability)
-_chirp_cache: dict[tuple, np.ndarray] = {}
+    def values(self) -> list[float]:
+        """Values in the window, oldest first."""
+        start = (self.head - self.count) % self.size
+        return [self.buf[(start + i) % self.size] for i in range(self.count)]
+
+    def clear(self):
+        self.head = 0
+        self.sum = 0.0
+        self.count = 0
+
+
+# Global smoothing buffer for distance measurements
+_distance_smoothing_buffer = _RunningMean(3)
 
 
 def compute_extra_record_seconds(
@@ -55,10 +110,109 @@ def compute_extra_record_seconds(
     if guard_seconds < 0:
         raise ValueError(f"guard_seconds must be >= 0, got {guard_seconds}")
 
-    sound_speed = SPEED_OF_SOUND.get(medium, SPEED_OF_SOUND["air"])
+    sound_speed = _sound_speed(medium)
     return (2.0 * float(max_distance_m)) / float(sound_speed) + float(guard_seconds)
 
 
+class _ChirpSet(NamedTuple):
+    """Cached chirps for one parameter set (all read-only, C-contiguous)."""
+    tx: np.ndarray   # Transmitted chirp, no window, peak = amplitude
+    ref: np.ndarray  # Windowed reference, peak 1.0 (matched filter)
+
+
+@lru_cache(maxsize=8)
+def _get_tx_ref(
+    start_freq: float,
+    end_freq: float,
+    duration: float,
+    amplitude: float,
+    reference_fade: float,
+    sample_rate: int,
+) -> _ChirpSet:
+    """Return the TX chirp and reference chirps, shared between calls.
+
+    tx has no window and peak `amplitude`; ref is windowed with
+    `reference_fade` and normalized to peak 1.0. Callers round the float
+    arguments so tiny drift (e.g. from GUI spin boxes) still hits the cache.
+    """
+    cfg_tx = ChirpConfig(
+        start_freq=start_freq,
+        end_freq=end_freq,
+        duration=duration,
+        amplitude=amplitude,
+        fade_fraction=0.0,  # NO window for transmission
+    )
+    chirp_tx = normalize(generate_chirp(cfg_tx, sample_rate=sample_rate), peak=amplitude)
+
+    # ALWAYS with window for reference
+    cfg_ref = replace(cfg_tx, fade_fraction=reference_fade)
+    chirp_ref = normalize(generate_chirp(cfg_ref, sample_rate=sample_rate), peak=1.0)
+
+    # Shared via the cache: stream.play_and_record and cross_correlation
+    # only read them, and this makes sure nobody else writes either
+    for arr in (chirp_tx, chirp_ref):
+        arr.setflags(write=False)
+    return _ChirpSet(chirp_tx, chirp_ref)
+
+
+def resolve_distance_window(
+    min_distance_m: float | None = None,
+    max_distance_m: float | None = None,
+) -> tuple[float, float]:
+    """Return (min_distance_m, max_distance_m), filling None from settings.
+
+    The window keeps unwanted echoes (close objects or far walls) out of
+    the peak search. Resolve it once before a series of measurements and
+    pass both values to measure_distance, so pings don't touch settings.
+    """
+    if min_distance_m is None:
+        min_distance_m = settings.get_min_distance()
+    if max_distance_m is None:
+        max_distance_m = settings.get_max_distance()
+    return float(min_distance_m), float(max_distance_m)
+
+
+def _select_echo_peak(corr_window: np.ndarray, min_distance: int = 50) -> int:
+    """Pick the echo peak in the correlation window; returns an index into it.
+
+    Same choice as running find_peaks(corr_window, 15, min_distance) and
+    keeping peaks > 30% of the maximum, but only the two strongest peaks
+    can affect the result, so only those are searched for (two argmax
+    passes, no copy of the window).
+    """
+    best = int(np.argmax(corr_window))
+    best_value = float(corr_window[best])
+    if best_value <= 0:
+        # No positive peak: use maximum value in window
+        return best
+
+    # Strongest peak outside the +-min_distance region around the maximum
+    left = corr_window[:max(0, best - min_distance)]
+    right = corr_window[best + min_distance:]
+    second = -1
+    second_value = 0.0
+    if left.size:
+        i = int(np.argmax(left))
+        second, second_value = i, float(left[i])
+    if right.size:
+        i = int(np.argmax(right))
+        if second < 0 or float(right[i]) > second_value:
+            second, second_value = best + min_distance + i, float(right[i])
+
+    # Filter weak peaks (only peaks > 30% of maximum)
+    if second < 0 or second_value <= best_value * 0.3:
+        return best
+
+    # If difference between top-2 peaks < 20%, this may be a problem:
+    # two peaks close in amplitude - possible instability.
+    # Choose earlier one (closer to window start) for stability,
+    # as distant reflections are usually weaker.
+    if (best_value - second_value) / best_value < 0.2:
+        return min(best, second)
+    # One peak is clearly stronger - use it
+    return best
+
+
 def set_smoothing_buffer_size(size: int):
     """Set the size of the distance smoothing buffer.
     
@@ -67,7 +221,13 @@ def set_smoothing_buffer_size(size: int):
     """
     global _distance_smoothing_buffer
     max_size = max(1, size)  # At least 1
-    _distance_smoothing_buffer = deque(_distance_smoothing_buffer, maxlen=max_size)
+    if max_size == _distance_smoothing_buffer.size:
+        return
+    # Keep the most recent values that still fit
+    resized = _RunningMean(max_size)
+    for value in _distance_smoothing_buffer.values()[-max_size:]:
+        resized.append(value)
+    _distance_smoothing_buffer = resized
 
 
 def clear_distance_smoothing():
@@ -78,8 +238,192 @@ def clear_distance_smoothing():
 
 def clear_chirp_cache():
     """Clear chirp cache (call when parameters change significantly)."""
-    global _chirp_cache
-    _chirp_cache.clear()
+    _get_tx_ref.cache_clear()
+    _build_plan.cache_clear()
+
+
+@dataclass(frozen=True)
+class MeasurementPlan:
+    """Everything measure_distance needs that only depends on its settings.
+
+    Built once per parameter set by prepare_measurement() (and cached), so
+    each ping only plays, records, correlates and picks the peak.
+    """
+    sample_rate: int
+    medium: str
+    sound_speed: float
+    system_latency_s: float
+    min_distance_m: float | None
+    max_distance_m: float | None
+    extra_record_seconds: float
+    record_frames: int  # Samples play_and_record returns (chirp + extra)
+    chirp_tx: np.ndarray
+    chirp_ref: np.ndarray
+    ref_spectrum: np.ndarray  # conj(RFFT) of chirp_ref for the trimmed recording
+    start_idx: int  # Lag search window (correlation index == lag in samples)
+    end_idx: int
+    max_lag: int  # Last correlation index the window (and interpolation) reads
+    tx_max: float
+    tx_rms: float
+
+
+@lru_cache(maxsize=8)
+def _build_plan(
+    start_freq: float,
+    end_freq: float,
+    duration: float,
+    amplitude: float,
+    reference_fade: float,
+    sample_rate: int,
+    medium: str,
+    system_latency_s: float,
+    min_distance_m: float | None,
+    max_distance_m: float | None,
+    extra_record_seconds: float | None,
+) -> MeasurementPlan:
+    # Validate parameters
+    if duration <= 0:
+        raise ValueError(f"Chirp duration must be positive, got {duration}")
+    if duration > 1.0:
+        raise ValueError(f"Chirp duration too long (max 1.0s), got {duration}")
+    if start_freq <= 0 or end_freq <= 0:
+        raise ValueError("Frequencies must be positive")
+    if start_freq >= end_freq:
+        raise ValueError("Start frequency must be less than end frequency")
+    if not (0.0 <= amplitude <= 1.0):
+        raise ValueError(f"Amplitude must be in [0, 1], got {amplitude}")
+    if min_distance_m is not None and min_distance_m < 0:
+        raise ValueError(f"min_distance_m must be >= 0, got {min_distance_m}")
+    if max_distance_m is not None and max_distance_m <= 0:
+        raise ValueError(f"max_distance_m must be > 0, got {max_distance_m}")
+    if min_distance_m is not None and max_distance_m is not None and min_distance_m >= max_distance_m:
+        raise ValueError(f"min_distance_m ({min_distance_m}) must be < max_distance_m ({max_distance_m})")
+    if extra_record_seconds is not None and extra_record_seconds < 0:
+        raise ValueError(f"extra_record_seconds must be >= 0, got {extra_record_seconds}")
+    
+    # Transmitted chirp WITHOUT window (maximum energy) and windowed reference,
+    # cached so repeated pings reuse identical samples (amplitude stability)
+    chirp_tx, chirp_ref = _get_tx_ref(
+        start_freq, end_freq, duration, amplitude, reference_fade, sample_rate
+    )
+    
+    sound_speed = _sound_speed(medium)
+    extra_rec = compute_extra_record_seconds(
+        medium=medium,
+        max_distance_m=max_distance_m,
+        extra_record_seconds=extra_record_seconds,
+        default_extra_record_seconds=0.1,
+        guard_seconds=0.005,
+    )
+    
+    # Correlation with reference (matched filter). cross_correlation(ref, sig)
+    # gives corr[k] = sum(sig[k + n] * ref[n]), so the non-reversed reference
+    # peaks at corr[D] for an echo delayed by D samples: index == lag. The
+    # latency calibration uses the same convention, so system_latency_s can
+    # be subtracted from the lag directly.
+    #
+    # IMPORTANT: TX time anchor (tx_sample_index) fixes the moment of TX chirp start
+    # in the recorded signal. For simplex systems (play/record simultaneously)
+    # tx_sample_index=0, i.e. TX chirp starts at recorded[0].
+    # This is critical for accurate echo delay and distance calculation.
+    #
+    # In correlation:
+    # - lag = 0 means echo arrived at tx_sample_index moment
+    # - lag > 0 means echo delay relative to TX
+    # - From lag we can compute distance: distance = (lag * sound_speed) / (2 * sample_rate)
+    # The persistent stream records the chirp plus extra_rec seconds;
+    # lags 0 .. record_frames - 1 are the non-negative ones
+    record_frames = len(chirp_tx) + int(extra_rec * sample_rate)
+
+    # Define valid lag window: after min_distance (or system latency), before max_distance.
+    # This is critical to avoid selecting unwanted echoes (close objects or far walls).
+    
+    # System latency in samples (not counting guard margin)
+    system_latency_samples = system_latency_s * sample_rate
+    
+    # Start of search window: system latency + max(guard margin, min_distance round-trip)
+    if min_distance_m is not None and min_distance_m > 0:
+        min_distance_lag = (2.0 * float(min_distance_m) / float(sound_speed)) * sample_rate
+        start_lag_samples = system_latency_samples + max(50, min_distance_lag)
+    else:
+        start_lag_samples = system_latency_samples + 50  # At least 50 sample guard
+    
+    start_idx = int(start_lag_samples)
+    
+    # End of search window: max_distance round-trip time (or end of correlation)
+    if max_distance_m is None or max_distance_m <= 0:
+        end_idx = record_frames - 2
+    else:
+        max_lag_samples = (2.0 * float(max_distance_m) / float(sound_speed)) * sample_rate
+        end_idx = int(min(record_frames - 2, int(max_lag_samples)))
+    
+    if end_idx <= start_idx + 2:
+        # Fallback if window is invalid
+        end_idx = record_frames - 2
+
+    # Last lag read: the window end (parabolic_interpolate's right
+    # neighbour of the last in-window peak). cross_correlation trims the
+    # recording to what lags up to here depend on.
+    max_lag = end_idx
+
+    return MeasurementPlan(
+        sample_rate=sample_rate,
+        medium=medium,
+        sound_speed=float(sound_speed),
+        system_latency_s=system_latency_s,
+        min_distance_m=min_distance_m,
+        max_distance_m=max_distance_m,
+        extra_record_seconds=float(extra_rec),
+        record_frames=record_frames,
+        chirp_tx=chirp_tx,
+        chirp_ref=chirp_ref,
+        ref_spectrum=reference_spectrum(
+            chirp_ref, min(record_frames, max_lag + len(chirp_ref))
+        ),
+        start_idx=start_idx,
+        end_idx=end_idx,
+        max_lag=max_lag,
+        # Transmitted signal amplitude (for volume jump diagnostics)
+        tx_max=float(np.max(np.abs(chirp_tx))),
+        tx_rms=float(np.sqrt(np.mean(chirp_tx**2))),
+    )
+
+
+def prepare_measurement(
+    cfg_audio: AudioDeviceConfig,
+    cfg_chirp: ChirpConfig,
+    medium: str = "air",
+    system_latency_s: float = 0.0,
+    reference_fade: float = 0.05,
+    min_distance_m: float | None = None,
+    max_distance_m: float | None = None,
+    extra_record_seconds: float | None = None,
+) -> MeasurementPlan:
+    """Validate parameters and precompute the per-ping constants.
+
+    Results are cached per parameter set; float inputs are rounded (whole Hz
+    for frequencies, 1e-9 otherwise) so tiny drift still hits the cache.
+
+    Raises:
+        ValueError: If parameters are invalid
+    """
+    # Form reference ALWAYS WITH WINDOW for correlation (reduces sidelobes)
+    # Window is always used on receive for better noise suppression.
+    # Even if user requests 0, we enforce minimum 5%.
+    reference_fade = max(reference_fade, MIN_REFERENCE_FADE)
+    return _build_plan(
+        float(round(cfg_chirp.start_freq)),
+        float(round(cfg_chirp.end_freq)),
+        round(float(cfg_chirp.duration), 9),
+        round(float(cfg_chirp.amplitude), 9),
+        round(float(reference_fade), 9),
+        int(cfg_audio.sample_rate),
+        medium,
+        round(float(system_latency_s), 9),
+        None if min_distance_m is None else round(float(min_distance_m), 9),
+        None if max_distance_m is None else round(float(max_distance_m), 9),
+        None if extra_record_seconds is None else round(float(extra_record_seconds), 9),
+    )
 
 
 def measure_distance(
@@ -112,109 +456,56 @@ def measure_distance(
         normalize_recorded: Normalize recorded signal before correlation (False = preserve SNR information)
     
     Returns:
-        dict with measurement results
+        dict with measurement results. refined_peak is the correlation
+        value at the selected echo; corr_max is the largest correlation
+        value over the lags that were computed (0 .. plan.max_lag), which
+        is usually the direct path rather than the echo.
         
     Raises:
         ValueError: If parameters are invalid
+        RuntimeError: If the stream returns a recording of unexpected length
     """
-    # Load min_distance_m and max_distance_m from settings if not provided
-    # This prevents selecting unwanted echoes (close objects or far walls)
-    if min_distance_m is None:
-        from echopi import settings
-        min_distance_m = settings.get_min_distance()
-    if max_distance_m is None:
-        from echopi import settings
-        max_distance_m = settings.get_max_distance()
+    # Load min_distance_m and max_distance_m from settings if not provided.
+    # Callers in a ranging loop should resolve them once up front instead.
+    if min_distance_m is None or max_distance_m is None:
+        min_distance_m, max_distance_m = resolve_distance_window(min_distance_m, max_distance_m)
+    
+    min_distance_m = float(min_distance_m)
+    max_distance_m = float(max_distance_m)
+    system_latency_s = float(system_latency_s)
     
-    # Validate parameters
-    if cfg_chirp.duration <= 0:
-        raise ValueError(f"Chirp duration must be positive, got {cfg_chirp.duration}")
-    if cfg_chirp.duration > 1.0:
-        raise ValueError(f"Chirp duration too long (max 1.0s), got {cfg_chirp.duration}")
-    if cfg_chirp.start_freq <= 0 or cfg_chirp.end_freq <= 0:
-        raise ValueError("Frequencies must be positive")
-    if cfg_chirp.start_freq >= cfg_chirp.end_freq:
-        raise ValueError("Start frequency must be less than end frequency")
-    if not (0.0 <= cfg_chirp.amplitude <= 1.0):
-        raise ValueError(f"Amplitude must be in [0, 1], got {cfg_chirp.amplitude}")
     if filter_size < 0:
         raise ValueError(f"Filter size must be >= 0, got {filter_size}")
-    if min_distance_m is not None and min_distance_m < 0:
-        raise ValueError(f"min_distance_m must be >= 0, got {min_distance_m}")
-    if max_distance_m is not None and max_distance_m <= 0:
-        raise ValueError(f"max_distance_m must be > 0, got {max_distance_m}")
-    if min_distance_m is not None and max_distance_m is not None and min_distance_m >= max_distance_m:
-        raise ValueError(f"min_distance_m ({min_distance_m}) must be < max_distance_m ({max_distance_m})")
-    if extra_record_seconds is not None and extra_record_seconds < 0:
-        raise ValueError(f"extra_record_seconds must be >= 0, got {extra_record_seconds}")
-    
-    # Generate transmitted chirp WITHOUT window (maximum energy)
-    # Use cache for amplitude stability (prevents volume jumps)
-    cfg_tx = ChirpConfig(
-        start_freq=cfg_chirp.start_freq,
-        end_freq=cfg_chirp.end_freq,
-        duration=cfg_chirp.duration,
-        amplitude=cfg_chirp.amplitude,
-        fade_fraction=0.0,  # NO window for transmission
-    )
-    
-    # Cache key: chirp parameters + sample_rate + amplitude
-    cache_key = (
-        cfg_tx.start_freq,
-        cfg_tx.end_freq,
-        cfg_tx.duration,
-        cfg_tx.fade_fraction,
-        cfg_audio.sample_rate,
-        cfg_chirp.amplitude,  # Include amplitude in key, as normalization depends on it
-    )
-    
-    if cache_key in _chirp_cache:
-        # Use cached chirp for stability
-        chirp_tx = _chirp_cache[cache_key].copy()
-    else:
-        # Generate new chirp and cache it
-        chirp_tx = generate_chirp(cfg_tx, sample_rate=cfg_audio.sample_rate)
-        chirp_tx = normalize(chirp_tx, peak=cfg_chirp.amplitude)
-        # Save to cache (copy for safety)
-        _chirp_cache[cache_key] = chirp_tx.copy()
-    
-    # Form reference ALWAYS WITH WINDOW for correlation (reduces sidelobes)
-    # Window is always used on receive for better noise suppression.
-    # Even if user requests 0, we enforce minimum 5%.
-    if reference_fade <= 0.0 or reference_fade < 0.05:
-        reference_fade = 0.05
-    
-    cfg_ref = ChirpConfig(
-        start_freq=cfg_chirp.start_freq,
-        end_freq=cfg_chirp.end_freq,
-        duration=cfg_chirp.duration,
-        amplitude=cfg_chirp.amplitude,
-        fade_fraction=reference_fade,  # ALWAYS with window for reference
-    )
-    chirp_ref = generate_chirp(cfg_ref, sample_rate=cfg_audio.sample_rate)
-    chirp_ref = normalize(chirp_ref, peak=1.0)  # Normalize reference
-    
-    # Transmission and recording
-    sound_speed = SPEED_OF_SOUND.get(medium, SPEED_OF_SOUND["air"])
-    extra_rec = compute_extra_record_seconds(
+    plan = prepare_measurement(
+        cfg_audio,
+        cfg_chirp,
         medium=medium,
+        system_latency_s=system_latency_s,
+        reference_fade=reference_fade,
+        min_distance_m=min_distance_m,
         max_distance_m=max_distance_m,
         extra_record_seconds=extra_record_seconds,
-        default_extra_record_seconds=0.1,
-        guard_seconds=0.005,
     )
-
-    # Check transmitted signal amplitude (for volume jump diagnostics)
-    tx_max = np.max(np.abs(chirp_tx))
-    tx_rms = np.sqrt(np.mean(chirp_tx**2))
     
     # Use global persistent stream for stable repeated measurements
     stream = get_global_stream(cfg_audio)
+    # Record into the stream's scratch buffer: nothing below keeps a
+    # reference to it past this call, so no allocation per measurement
     # Get TX time anchor for accurate correlation
-    recorded, tx_sample_index = stream.play_and_record(chirp_tx, extra_record_seconds=extra_rec)
+    recorded, tx_sample_index = stream.play_and_record(
+        plan.chirp_tx,
+        extra_record_seconds=plan.extra_record_seconds,
+        out=stream.record_buffer(plan.record_frames),
+    )
+    # The lag window and ref_spectrum are sized for exactly this length
+    if len(recorded) != plan.record_frames:
+        raise RuntimeError(
+            f"Recorded {len(recorded)} samples, expected {plan.record_frames}"
+        )
     
     # Check for recorded signal clipping
-    recorded_max = np.max(np.abs(recorded))
+    # (max/min instead of max(abs()) avoids a temporary the size of recorded)
+    recorded_max = max(float(recorded.max()), -float(recorded.min()))
     if recorded_max >= 0.99:
         # Signal is clipped - this may distort correlation
         # Normalization may help in this case, but better to reduce amplitude
@@ -236,133 +527,67 @@ def measure_distance(
     if normalize_recorded and recorded_max > 0.01 and recorded_max < 0.99:
         # Energy normalization (unit norm) - more stable for matched filter
         # This eliminates amplitude influence on correlation result
-        recorded_energy = np.sqrt(np.sum(recorded**2))
+        recorded_energy = np.sqrt(np.dot(recorded, recorded))
         if recorded_energy > 1e-10:  # Protection against division by zero
-            recorded = recorded / recorded_energy
-    
-    # Correlation with reference (matched filter: use reversed chirp)
-    # For matched filter we need to use reversed reference
-    #
-    # IMPORTANT: TX time anchor (tx_sample_index) fixes the moment of TX chirp start
-    # in the recorded signal. For simplex systems (play/record simultaneously)
-    # tx_sample_index=0, i.e. TX chirp starts at recorded[0].
-    # This is critical for accurate echo delay and distance calculation.
-    #
-    # In correlation:
-    # - lag = 0 means echo arrived at tx_sample_index moment
-    # - lag > 0 means echo delay relative to TX
-    # - From lag we can compute distance: distance = (lag * sound_speed) / (2 * sample_rate)
-    chirp_ref_reversed = chirp_ref[::-1]
-    lag_samples, peak, corr = cross_correlation(chirp_ref_reversed, recorded)
-
-    ref_offset = len(chirp_ref) - 1
-
-    # Define valid lag window: after min_distance (or system latency), before max_distance.
-    # This is critical to avoid selecting unwanted echoes (close objects or far walls).
+            recorded /= recorded_energy  # in place: recorded is scratch
     
-    # System latency in samples (not counting guard margin)
-    system_latency_samples = system_latency_s * cfg_audio.sample_rate
-    
-    # Start of search window: system latency + max(guard margin, min_distance round-trip)
-    if min_distance_m is not None and min_distance_m > 0:
-        min_distance_lag = (2.0 * float(min_distance_m) / float(sound_speed)) * cfg_audio.sample_rate
-        start_lag_samples = system_latency_samples + max(50, min_distance_lag)
-    else:
-        start_lag_samples = system_latency_samples + 50  # At least 50 sample guard
-    
-    start_idx = int(ref_offset + int(start_lag_samples))
-    
-    # End of search window: max_distance round-trip time (or end of correlation)
-    if max_distance_m is None or max_distance_m <= 0:
-        end_idx = len(corr) - 2
-    else:
-        max_lag_samples = (2.0 * float(max_distance_m) / float(sound_speed)) * cfg_audio.sample_rate
-        end_idx = int(min(len(corr) - 2, ref_offset + int(max_lag_samples)))
-    
-    if end_idx <= start_idx + 2:
-        # Fallback if window is invalid
-        end_idx = len(corr) - 2
+    # Only lags up to the window end (+ interpolation neighbour and margin)
+    # are looked at; the rest of the recording is left out of the FFT
+    _, corr_max, corr = cross_correlation(
+        plan.chirp_ref,
+        recorded,
+        ref_spectrum=plan.ref_spectrum,
+        max_lag=plan.max_lag,
+    )
 
-    corr_window = corr[start_idx:end_idx]
+    start_idx = plan.start_idx
+    corr_window = corr[start_idx:plan.end_idx]
     if corr_window.size == 0:
         raise ValueError("Correlation window is empty; check max_distance/latency")
 
-    # Find all peaks in the correlation window
-    peaks = find_peaks(corr_window, num_peaks=15, min_distance=50)
-    
-    if len(peaks) > 0:
-        # Filter weak peaks (only peaks > 30% of maximum)
-        max_peak_value = peaks[0][1]
-        strong_peaks = [(idx, val) for idx, val in peaks if val > max_peak_value * 0.3]
-        
-        if len(strong_peaks) > 0:
-            # If there are multiple strong peaks, choose the strongest
-            # But if difference between top-2 peaks < 20%, this may be a problem
-            if len(strong_peaks) > 1:
-                top2_diff = (strong_peaks[0][1] - strong_peaks[1][1]) / strong_peaks[0][1]
-                if top2_diff < 0.2:
-                    # Two peaks close in amplitude - possible instability
-                    # Choose earlier one (closer to window start) for stability
-                    # This is preferable as distant reflections are usually weaker
-                    best_peak_relative_idx, best_peak_value = min(strong_peaks[:2], key=lambda p: p[0])
-                else:
-                    # One peak is clearly stronger - use it
-                    best_peak_relative_idx, best_peak_value = strong_peaks[0]
-            else:
-                best_peak_relative_idx, best_peak_value = strong_peaks[0]
-            
-            best_peak_idx = start_idx + best_peak_relative_idx
-        else:
-            # No strong peaks - use maximum
-            best_peak_relative_idx, best_peak_value = peaks[0]
-            best_peak_idx = start_idx + best_peak_relative_idx
-    else:
-        # Fallback: use maximum value in window
-        best_peak_idx = int(start_idx + np.argmax(corr_window))
+    best_peak_idx = start_idx + _select_echo_peak(corr_window)
     
     # Final interpolation of selected peak
-    refined_idx, refined_peak = parabolic_interpolate(corr, best_peak_idx)
-    refined_lag = refined_idx - ref_offset
-    lag_samples = best_peak_idx - ref_offset
+    # Correlation index == lag (see _build_plan)
+    refined_lag, refined_peak = parabolic_interpolate(corr, best_peak_idx)
+    lag_samples = best_peak_idx
     
     # Propagation time (subtract system latency)
-    total_time_s = refined_lag / cfg_audio.sample_rate
+    total_time_s = refined_lag / plan.sample_rate
     time_of_flight_s = total_time_s - system_latency_s
     
     # Distance: R = (c × t) / 2  (divide by 2, as it's round trip)
-    distance_m = (sound_speed * time_of_flight_s) / 2.0
+    distance_m = (plan.sound_speed * time_of_flight_s) / 2.0
     
     # Apply smoothing if enabled and filter_size > 1 (0 or 1 = no filtering)
-    global _distance_smoothing_buffer
     if enable_smoothing and filter_size > 1:
         # Update buffer size if changed
-        if _distance_smoothing_buffer.maxlen != filter_size:
+        if _distance_smoothing_buffer.size != filter_size:
             set_smoothing_buffer_size(filter_size)
-        _distance_smoothing_buffer.append(distance_m)
-        # Calculate smoothed distance (average of recent measurements)
-        if len(_distance_smoothing_buffer) > 0:
-            smoothed_distance_m = sum(_distance_smoothing_buffer) / len(_distance_smoothing_buffer)
-        else:
-            smoothed_distance_m = distance_m
+        # Smoothed distance: average of recent measurements
+        smoothed_distance_m = _distance_smoothing_buffer.append(distance_m)
     else:
         smoothed_distance_m = distance_m
     
+    # Everything below is already a Python float/int (plan fields, float()
+    # results of cross_correlation/parabolic_interpolate, recorded_max), so
+    # no casts needed
     return {
-        "time_of_flight_s": float(time_of_flight_s),
-        "distance_m": float(distance_m),
-        "smoothed_distance_m": float(smoothed_distance_m),
-        "lag_samples": int(lag_samples),
-        "refined_lag": float(refined_lag),
-        "peak": float(peak),
-        "refined_peak": float(refined_peak),
-        "sound_speed": float(sound_speed),
+        "time_of_flight_s": time_of_flight_s,
+        "distance_m": distance_m,
+        "smoothed_distance_m": smoothed_distance_m,
+        "lag_samples": lag_samples,
+        "refined_lag": refined_lag,
+        "corr_max": corr_max,
+        "refined_peak": refined_peak,
+        "sound_speed": plan.sound_speed,
         "medium": medium,
-        "total_time_s": float(total_time_s),
-        "system_latency_s": float(system_latency_s),
-        "extra_record_seconds": float(extra_rec),
-        "max_distance_m": None if max_distance_m is None else float(max_distance_m),
+        "total_time_s": total_time_s,
+        "system_latency_s": system_latency_s,
+        "extra_record_seconds": plan.extra_record_seconds,
+        "max_distance_m": max_distance_m,
         # Amplitude diagnostics (for volume jump detection)
-        "tx_max": float(tx_max),
-        "tx_rms": float(tx_rms),
-        "recorded_max": float(recorded_max),
+        "tx_max": plan.tx_max,
+        "tx_rms": plan.tx_rms,
+        "recorded_max": recorded_max,
     }
@@ -1,14 +1,87 @@
 from __future__ import annotations
 
+import dataclasses
+import functools
+
 import numpy as np
+import scipy.signal
 import time
 
 from echopi.config import AudioDeviceConfig, ChirpConfig
 from echopi.dsp.chirp import generate_chirp, normalize
-from echopi.dsp.correlation import cross_correlation, find_peaks, parabolic_interpolate
+from echopi.dsp.correlation import cross_correlation, correlate_lags, find_peaks, parabolic_interpolate
 from echopi.io.audio_safe import get_global_stream, close_global_stream
 
 
+# Correlation peaks weaker than this (relative to recording RMS * reference
+# length) are treated as noise: nothing from the speaker reached the mic.
+NOISE_FLOOR_DB = -60.0
+
+# High-pass prefilter: rooms carry strong <200 Hz energy (mains hum, HVAC)
+# that otherwise dominates the correlation. Cutoff stays below the chirp.
+HIGHPASS_CUTOFF_HZ = 1500.0
+
+
+@functools.lru_cache(maxsize=8)
+def _highpass_sos(cutoff_hz: float, sample_rate: int) -> np.ndarray:
+    """4th-order Butterworth high-pass (second-order sections), cached.
+
+    Coefficients are float32 so sosfiltfilt keeps float32 recordings in
+    single precision (no float64 result to convert back).
+    """
+    sos = scipy.signal.butter(4, cutoff_hz, btype="highpass", fs=sample_rate, output="sos")
+    return sos.astype(np.float32)
+
+
+@functools.lru_cache(maxsize=8)
+def _latency_chirps(
+    start_freq: float,
+    end_freq: float,
+    duration: float,
+    amplitude: float,
+    fade_fraction: float,
+    sample_rate: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(chirp, chirp_ref) for latency calibration, cached and read-only.
+
+    chirp is played (peak = amplitude); chirp_ref is the windowed
+    correlation reference (peak 1.0).
+    """
+    cfg = ChirpConfig(
+        start_freq=start_freq,
+        end_freq=end_freq,
+        duration=duration,
+        amplitude=amplitude,
+        fade_fraction=fade_fraction,
+    )
+    chirp = normalize(generate_chirp(cfg, sample_rate=sample_rate), peak=amplitude)
+
+    # For correlation, prefer a windowed reference to reduce sidelobes.
+    cfg_ref = dataclasses.replace(cfg, fade_fraction=0.05)
+    chirp_ref = normalize(generate_chirp(cfg_ref, sample_rate=sample_rate), peak=1.0)
+
+    chirp.setflags(write=False)
+    chirp_ref.setflags(write=False)
+    return chirp, chirp_ref
+
+
+@functools.lru_cache(maxsize=4)
+def _silent_block(frames: int) -> np.ndarray:
+    """Read-only block of silence for the warmup job, cached per block size."""
+    block = np.zeros(frames, dtype=np.float32)
+    block.setflags(write=False)
+    return block
+
+
+def _sorted_median(values: np.ndarray) -> float:
+    """Median of an already sorted 1-D array (same as np.median)."""
+    n = values.size
+    mid = n // 2
+    if n % 2:
+        return float(values[mid])
+    return float((values[mid - 1] + values[mid]) / 2.0)
+
+
 def _pick_latency_from_recording(
     *,
     recorded: np.ndarray,
@@ -16,50 +89,59 @@ def _pick_latency_from_recording(
     sample_rate: int,
     max_latency_s: float = 0.003,  # Reduced from 0.005 to 0.003 (3ms) to avoid picking echoes
     min_latency_s: float = 0.0005,
-) -> tuple[float, int, float, int, float, np.ndarray]:
-    """Return (latency_s, lag_samples, peak, global_lag, global_peak, corr)."""
-    global_lag_samples, global_peak, corr = cross_correlation(chirp_ref, recorded)
-    ref_offset = len(chirp_ref) - 1
+) -> tuple[float, int, float]:
+    """Return (latency_s, lag_samples, peak).
 
+    A lag of k samples means the chirp starts at recorded[k] (same
+    convention as measure_distance, which subtracts this latency).
+    Only the plausible direct-path lag range is correlated (direct method),
+    which is much cheaper than a full FFT correlation of the recording.
+    """
     min_lag_samples = max(10, int(min_latency_s * sample_rate))
-    start_idx = ref_offset + min_lag_samples
-    end_idx = int(
+    max_lag_samples = int(
         min(
-            len(corr) - 2,
-            ref_offset + max(3, int(max_latency_s * sample_rate)),
+            len(recorded) + len(chirp_ref) - 3,
+            max(3, int(max_latency_s * sample_rate)),
         )
     )
-    corr_window = corr[start_idx:end_idx]
-
-    if corr_window.size:
-        # For latency measurement, we want the EARLIEST strong peak in a narrow window
-        # This is the direct signal path (microphone/speaker should be close for latency calibration)
-        # We take earliest (chronologically first) to avoid echoes/reflections
-        peaks = find_peaks(corr_window, num_peaks=30, min_distance=10)
-        
-        if peaks:
-            # Filter peaks to only strong ones (>50% of strongest peak)
-            max_amp = peaks[0][1]  # peaks sorted by amplitude descending
-            strong_peaks = [(idx, amp) for idx, amp in peaks if amp > max_amp * 0.5]
-            
-            # Take the EARLIEST (lowest index) among strong peaks
-            earliest_idx = min(strong_peaks, key=lambda p: p[0])[0]
-            best_peak_idx = int(start_idx + earliest_idx)
-        else:
-            best_peak_idx = int(start_idx + np.argmax(corr_window))
+    if max_lag_samples <= min_lag_samples:
+        raise ValueError("Latency search window is empty; recording too short")
+
+    # One extra lag on each side so parabolic interpolation has neighbours
+    corr_offset = min_lag_samples - 1
+    corr = correlate_lags(chirp_ref, recorded, corr_offset, max_lag_samples + 1)
+    start_idx = 1
+    corr_window = corr[start_idx:-1]
+
+    # Energy gate: reject recordings where nothing rises above the noise floor
+    # (dot() reduces without a squared temporary the size of the recording)
+    recorded_rms = float(np.sqrt(np.dot(recorded, recorded) / recorded.size))
+    noise_floor = 10 ** (NOISE_FLOOR_DB / 20.0) * recorded_rms * len(chirp_ref)
+    # One scan for the maximum: gates here and is the fallback peak below
+    max_pos = int(np.argmax(corr_window))
+    if float(corr_window[max_pos]) <= noise_floor:
+        raise ValueError("Correlation peak below noise floor; check speaker and microphone")
+
+    # For latency measurement, we want the EARLIEST strong peak in a narrow window
+    # This is the direct signal path (microphone/speaker should be close for latency calibration)
+    # We take earliest (chronologically first) to avoid echoes/reflections
+    # Only strong peaks (>50% of strongest peak) are returned
+    strong_peaks = find_peaks(corr_window, num_peaks=30, min_distance=10, min_ratio=0.5)
+    
+    if strong_peaks:
+        # Take the EARLIEST (lowest index) among strong peaks
+        earliest_idx = min(idx for idx, _ in strong_peaks)
+        best_peak_idx = int(start_idx + earliest_idx)
     else:
-        best_peak_idx = int(np.argmax(corr))
+        best_peak_idx = start_idx + max_pos
 
     refined_idx, refined_peak = parabolic_interpolate(corr, best_peak_idx)
-    refined_lag = refined_idx - ref_offset
+    refined_lag = refined_idx + corr_offset
     latency_seconds = float(refined_lag / sample_rate)
     return (
         latency_seconds,
         int(round(refined_lag)),
         float(refined_peak),
-        int(global_lag_samples),
-        float(global_peak),
-        corr,
     )
 
 
@@ -69,20 +151,37 @@ def measure_latency(
     *,
     repeats: int = 7,
     discard: int = 2,
+    rec_buf: np.ndarray | None = None,
+    extra_record_seconds: float = 0.1,
+    warmup: bool = True,
 ) -> dict:
-    chirp = generate_chirp(cfg_chirp, sample_rate=cfg_audio.sample_rate)
-    chirp = normalize(chirp, peak=cfg_chirp.amplitude)
+    """Measure system (speaker-to-microphone) latency.
 
-    # For correlation, prefer a windowed reference to reduce sidelobes.
-    cfg_ref = ChirpConfig(
-        start_freq=cfg_chirp.start_freq,
-        end_freq=cfg_chirp.end_freq,
-        duration=cfg_chirp.duration,
-        amplitude=cfg_chirp.amplitude,
-        fade_fraction=0.05,
+    Recordings are acquired one after another, then high-pass filtered as
+    one (repeats, N) batch; only the repeats kept after `discard` are
+    analysed. If rec_buf (float32) is given, the batch is stored in it
+    instead of a new array; it must hold repeats * N samples, where
+    N = chirp length + extra_record_seconds * sample_rate.
+    extra_record_seconds is the recording time after the chirp; it only
+    needs to cover the direct-path search window (3 ms) plus device
+    buffering.
+    warmup=False skips the silent flush job, e.g. when a calibration ran
+    on the same stream just before.
+    """
+    chirp, chirp_ref = _latency_chirps(
+        float(cfg_chirp.start_freq),
+        float(cfg_chirp.end_freq),
+        float(cfg_chirp.duration),
+        float(cfg_chirp.amplitude),
+        float(cfg_chirp.fade_fraction),
+        int(cfg_audio.sample_rate),
+    )
+
+    # Zero-phase filtering (sosfiltfilt) so the prefilter adds no delay
+    hp_sos = _highpass_sos(
+        min(HIGHPASS_CUTOFF_HZ, 0.75 * float(cfg_chirp.start_freq)),
+        int(cfg_audio.sample_rate),
     )
-    chirp_ref = generate_chirp(cfg_ref, sample_rate=cfg_audio.sample_rate)
-    chirp_ref = normalize(chirp_ref, peak=1.0)
 
     if repeats < 1:
         raise ValueError(f"repeats must be >= 1, got {repeats}")
@@ -94,85 +193,113 @@ def measure_latency(
     # Warmup/flush: a short silent job helps drop stale buffered samples.
     # Use global persistent stream for all measurements
     stream = get_global_stream(cfg_audio)
-    try:
-        _ = stream.play_and_record(
-            np.zeros(cfg_audio.frames_per_buffer, dtype=np.float32),
-            extra_record_seconds=0.0,
-            return_tx_index=False,  # TX index not needed for warmup
-        )
-    except Exception:
-        pass
+    if warmup:
+        silence = _silent_block(int(cfg_audio.frames_per_buffer))
+        try:
+            # Recording is discarded: write it into the stream's scratch
+            stream.play_and_record(
+                silence,
+                extra_record_seconds=0.0,
+                return_tx_index=False,  # TX index not needed for warmup
+                out=stream.record_buffer(silence.size),
+            )
+        except Exception:
+            pass
 
-    latencies_s: list[float] = []
-    peaks: list[float] = []
-    last_corr_len = 0
-    last_global_lag = 0
-    last_global_peak = 0.0
+    # All repeats recorded back to back into one (repeats, N) batch
+    n_rec = len(chirp) + int(extra_record_seconds * cfg_audio.sample_rate)
+    if rec_buf is None:
+        recordings = np.empty((repeats, n_rec), dtype=np.float32)
+    else:
+        if rec_buf.dtype != np.float32 or not rec_buf.flags.c_contiguous:
+            raise ValueError("rec_buf must be a contiguous float32 array")
+        if rec_buf.size < repeats * n_rec:
+            raise ValueError(
+                f"rec_buf too small: {rec_buf.size} < {repeats * n_rec} samples"
+            )
+        recordings = rec_buf.reshape(-1)[:repeats * n_rec].reshape(repeats, n_rec)
 
-    extra_record_seconds = 0.1
     # Minimum repeat period: cannot be shorter than chirp+record window.
     # Add a small guard for driver buffering and scheduling jitter.
     min_repeat_s = float(cfg_chirp.duration) + float(extra_record_seconds) + 0.02
 
+    # Repeats start on a fixed schedule (one clock read per repeat, no drift)
+    next_start = time.monotonic()
     for i in range(repeats):
-        t0 = time.monotonic()
         # For latency calibration use old API (only recorded)
-        recorded = stream.play_and_record(chirp, extra_record_seconds=extra_record_seconds, return_tx_index=False)
-        (
-            latency_s,
-            lag_samp,
-            peak,
-            global_lag,
-            global_peak,
-            corr,
-        ) = _pick_latency_from_recording(
+        recorded = stream.play_and_record(
+            chirp,
+            extra_record_seconds=extra_record_seconds,
+            return_tx_index=False,
+            out=recordings[i],
+        )
+        if not np.may_share_memory(recorded, recordings[i]):
+            # Stream returned its own array instead of filling the row
+            recordings[i] = recorded
+
+        next_start += min_repeat_s
+        slack = next_start - time.monotonic()
+        if slack > 0:
+            time.sleep(slack)
+        else:
+            # Overran: restart the schedule now rather than catch up with
+            # back-to-back repeats
+            next_start -= slack
+
+    # Acquisition must stay serialized; the analysis is post-processing.
+    # Discarded (warm-up) repeats are not analysed at all.
+    filtered = scipy.signal.sosfiltfilt(hp_sos, recordings[discard:], axis=-1)
+
+    # One slot per analysed repeat, filled in place
+    arr = np.empty(len(filtered), dtype=np.float64)
+    peaks = np.empty(len(filtered), dtype=np.float64)
+    for i, recorded in enumerate(filtered):
+        arr[i], _, peaks[i] = _pick_latency_from_recording(
             recorded=recorded,
             chirp_ref=chirp_ref,
             sample_rate=cfg_audio.sample_rate,
         )
-        last_corr_len = len(corr)
-        last_global_lag = global_lag
-        last_global_peak = global_peak
-
-        if i >= discard:
-            latencies_s.append(float(latency_s))
-            peaks.append(float(peak))
 
-        elapsed = time.monotonic() - t0
-        if elapsed < min_repeat_s:
-            time.sleep(min_repeat_s - elapsed)
+    # Full correlation of the last run, for diagnostics only; its length is
+    # known up front, so the array itself is not kept
+    global_lag, global_peak, _ = cross_correlation(chirp_ref, filtered[-1])
+    corr_len = filtered.shape[1] + len(chirp_ref) - 1
 
-    arr = np.asarray(latencies_s, dtype=np.float64)
-    raw_median_s = float(np.median(arr))
+    # One sort serves both the raw median and the inlier median below
+    arr_sorted = np.sort(arr)
+    raw_median_s = _sorted_median(arr_sorted)
     raw_std_s = float(np.std(arr)) if arr.size > 1 else 0.0
 
     # Robust inlier selection using MAD. This helps when a few runs lock onto a
     # reflection peak and produce large outliers.
     abs_dev = np.abs(arr - raw_median_s)
-    mad_s = float(np.median(abs_dev))
+    mad_s = _sorted_median(np.sort(abs_dev))
     if mad_s > 0:
         inlier_mask = abs_dev <= (3.5 * mad_s)
         used = arr[inlier_mask]
+        # Masking a sorted array keeps it sorted
+        used_sorted = arr_sorted[np.abs(arr_sorted - raw_median_s) <= (3.5 * mad_s)]
+        median_s = _sorted_median(used_sorted)
     else:
         used = arr
+        median_s = raw_median_s
 
-    median_s = float(np.median(used))
     std_s = float(np.std(used)) if used.size > 1 else 0.0
 
     return {
         "lag_samples": int(round(median_s * cfg_audio.sample_rate)),
         "latency_seconds": float(median_s),
         "latency_std_seconds": float(std_s),
-        "latencies_seconds": [float(x) for x in arr],
-        "latencies_used_seconds": [float(x) for x in used],
+        "latencies_seconds": arr.tolist(),
+        "latencies_used_seconds": used.tolist(),
         "latency_raw_median_seconds": float(raw_median_s),
         "latency_raw_std_seconds": float(raw_std_s),
         "latency_mad_seconds": float(mad_s),
-        "peak": float(np.median(np.asarray(peaks, dtype=np.float64))) if peaks else 0.0,
-        "correlation_length": int(last_corr_len),
+        "peak": float(np.median(peaks)) if peaks.size else 0.0,
+        "correlation_length": corr_len,
         "repeats": int(repeats),
         "discard": int(discard),
         "search_window_s": 0.005,
-        "global_lag_samples": int(last_global_lag),
-        "global_peak": float(last_global_peak),
+        "global_lag_samples": int(global_lag),
+        "global_peak": float(global_peak),
     }
@@ -1,10 +1,9 @@
+import os
 import unittest
+import unittest.mock
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Headless backend
-import matplotlib.pyplot as plt
 from pathlib import Path
-from echopi.dsp.correlation import cross_correlation, find_peaks, parabolic_interpolate
+from echopi.dsp.correlation import cross_correlation, correlate_lags, find_peaks, parabolic_interpolate, reference_spectrum
 from echopi.dsp.chirp import generate_chirp, normalize
 from echopi.dsp.tone import generate_sine
 from echopi.dsp.signal_optimization import (
@@ -12,11 +11,53 @@ from echopi.dsp.signal_optimization import (
     calculate_processing_gain,
     calculate_optimal_bandwidth
 )
-from echopi.config import ChirpConfig
+from echopi.config import AudioDeviceConfig, ChirpConfig
+
+# distance/latency import sounddevice, which needs the PortAudio library
+try:
+    from echopi.utils import distance, latency
+except (ImportError, OSError):
+    distance = latency = None
+
+# Debug plots are only drawn with ECHOPI_TEST_PLOTS=1; they dominate the
+# suite's run time and are not needed for the checks themselves
+SAVE_PLOTS = os.environ.get("ECHOPI_TEST_PLOTS", "") not in ("", "0")
 
 # Output directory for test plots
 OUTPUT_DIR = Path("unit/test_output")
-OUTPUT_DIR.mkdir(exist_ok=True)
+
+
+def save_debug_plot(name, draw):
+    """Draw a debug figure with draw(plt) and save it as OUTPUT_DIR/<name>.png.
+
+    Does nothing (matplotlib is not even imported) unless ECHOPI_TEST_PLOTS
+    is set.
+    """
+    if not SAVE_PLOTS:
+        return
+    import matplotlib
+    matplotlib.use('Agg')  # Headless backend
+    import matplotlib.pyplot as plt
+
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    draw(plt)
+    plt.tight_layout()
+    plt.savefig(OUTPUT_DIR / f'{name}.png', dpi=150)
+    plt.close()
+    print(f"✓ Saved: {OUTPUT_DIR / f'{name}.png'}")
+
+
+def plot_spectrogram(ax, x, fs, title, khz=False, **kwargs):
+    """Spectrogram of x (dB) on ax; frequency axis in kHz if khz."""
+    from scipy import signal
+    f, t, Sxx = signal.spectrogram(x, fs=fs, nperseg=256)
+    scale = 1000 if khz else 1
+    ax.pcolormesh(t * 1000, f / scale, 10 * np.log10(Sxx + 1e-10),
+                  shading='gouraud', **kwargs)
+    ax.set_title(title)
+    ax.set_ylabel('Frequency (kHz)' if khz else 'Frequency (Hz)')
+    ax.set_xlabel('Time (ms)')
+
 
 class TestDSP(unittest.TestCase):
     def test_cross_correlation(self):
@@ -29,30 +70,43 @@ class TestDSP(unittest.TestCase):
         
         self.assertEqual(peak_idx, shift)
         self.assertGreater(peak, 0.9)
+
+        # Precomputed reference spectrum gives the same correlation
+        _, _, corr_pre = cross_correlation(ref, sig, ref_spectrum=reference_spectrum(ref, len(sig)))
+        np.testing.assert_allclose(corr_pre, corr, atol=1e-5)
+
+        # max_lag trims the signal but keeps lags up to max_lag unchanged
+        _, _, corr_short = cross_correlation(ref, sig, max_lag=30)
+        self.assertLess(len(corr_short), len(corr))
+        np.testing.assert_allclose(corr_short[:31], corr[:31], atol=1e-5)
+
+        # A spectrum made for another FFT length is rejected, not recomputed
+        with self.assertRaises(ValueError):
+            cross_correlation(ref, sig, ref_spectrum=reference_spectrum(ref, 2000))
+        with self.assertRaises(ValueError):
+            cross_correlation(ref, sig, ref_spectrum=reference_spectrum(ref, len(sig)), max_lag=30)
         
         # Save plot
-        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 8))
-        ax1.plot(ref)
-        ax1.set_title('Reference Signal')
-        ax1.set_xlabel('Sample')
-        ax1.grid(True)
-        
-        ax2.plot(sig)
-        ax2.set_title(f'Signal (shifted by {shift} samples)')
-        ax2.set_xlabel('Sample')
-        ax2.grid(True)
-        
-        ax3.plot(corr)
-        ax3.axvline(peak_idx, color='r', linestyle='--', label=f'Peak at {peak_idx}')
-        ax3.set_title(f'Cross-correlation (peak={peak:.3f})')
-        ax3.set_xlabel('Lag (samples)')
-        ax3.legend()
-        ax3.grid(True)
-        
-        plt.tight_layout()
-        plt.savefig(OUTPUT_DIR / 'test_cross_correlation.png', dpi=150)
-        plt.close()
-        print(f"✓ Saved: {OUTPUT_DIR / 'test_cross_correlation.png'}")
+        def draw(plt):
+            fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 8))
+            ax1.plot(ref)
+            ax1.set_title('Reference Signal')
+            ax1.set_xlabel('Sample')
+            ax1.grid(True)
+        
+            ax2.plot(sig)
+            ax2.set_title(f'Signal (shifted by {shift} samples)')
+            ax2.set_xlabel('Sample')
+            ax2.grid(True)
+        
+            ax3.plot(corr)
+            ax3.axvline(peak_idx, color='r', linestyle='--', label=f'Peak at {peak_idx}')
+            ax3.set_title(f'Cross-correlation (peak={peak:.3f})')
+            ax3.set_xlabel('Lag (samples)')
+            ax3.legend()
+            ax3.grid(True)
+
+        save_debug_plot('test_cross_correlation', draw)
 
     def test_find_peaks(self):
         corr = np.array([0, 1, 0, 0, 0.5, 0, 0, 0.8, 0])
@@ -62,21 +116,36 @@ class TestDSP(unittest.TestCase):
         self.assertEqual(peaks[0], (1, 1.0))
         self.assertEqual(peaks[1], (7, 0.8))
         self.assertEqual(peaks[2], (4, 0.5))
-        
+
+        # min_ratio keeps only peaks above that fraction of the strongest
+        strong = find_peaks(corr, num_peaks=3, min_distance=1, min_ratio=0.6)
+        self.assertEqual(strong, [(1, 1.0), (7, 0.8)])
+
         # Save plot
-        fig, ax = plt.subplots(figsize=(10, 5))
-        ax.plot(corr, 'b-o', label='Correlation')
-        for i, (idx, val) in enumerate(peaks):
-            ax.plot(idx, val, 'r*', markersize=15, label=f'Peak {i+1}' if i < 3 else '')
-        ax.set_title('Peak Detection')
-        ax.set_xlabel('Index')
-        ax.set_ylabel('Value')
-        ax.legend()
-        ax.grid(True)
-        plt.tight_layout()
-        plt.savefig(OUTPUT_DIR / 'test_find_peaks.png', dpi=150)
-        plt.close()
-        print(f"✓ Saved: {OUTPUT_DIR / 'test_find_peaks.png'}")
+        def draw(plt):
+            fig, ax = plt.subplots(figsize=(10, 5))
+            ax.plot(corr, 'b-o', label='Correlation')
+            for i, (idx, val) in enumerate(peaks):
+                ax.plot(idx, val, 'r*', markersize=15, label=f'Peak {i+1}' if i < 3 else '')
+            ax.set_title('Peak Detection')
+            ax.set_xlabel('Index')
+            ax.set_ylabel('Value')
+            ax.legend()
+            ax.grid(True)
+
+        save_debug_plot('test_find_peaks', draw)
+
+    def test_correlate_lags(self):
+        rng = np.random.default_rng(0)
+        ref = rng.standard_normal(100)
+        sig = rng.standard_normal(300)
+        
+        _, _, corr = cross_correlation(ref, sig)
+        # Range runs past the end of sig (zero-padded)
+        direct = correlate_lags(ref, sig, 150, 260)
+        
+        self.assertEqual(len(direct), 110)
+        np.testing.assert_allclose(direct, corr[150:260], rtol=1e-4, atol=1e-3)
 
     def test_parabolic_interpolate(self):
         corr = np.array([0, 9, 10, 9, 0])
@@ -98,27 +167,20 @@ class TestDSP(unittest.TestCase):
         self.assertEqual(chirp.dtype, np.float32)
         
         # Save plot
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
-        time_axis = np.arange(len(chirp)) / 10000
-        
-        ax1.plot(time_axis * 1000, chirp)
-        ax1.set_title(f'Chirp Signal ({cfg.start_freq}-{cfg.end_freq} Hz, {cfg.duration}s)')
-        ax1.set_xlabel('Time (ms)')
-        ax1.set_ylabel('Amplitude')
-        ax1.grid(True)
-        
-        # Spectrogram
-        from scipy import signal
-        f, t, Sxx = signal.spectrogram(chirp, fs=10000, nperseg=256)
-        ax2.pcolormesh(t * 1000, f, 10 * np.log10(Sxx + 1e-10), shading='gouraud')
-        ax2.set_title('Spectrogram')
-        ax2.set_ylabel('Frequency (Hz)')
-        ax2.set_xlabel('Time (ms)')
-        
-        plt.tight_layout()
-        plt.savefig(OUTPUT_DIR / 'test_generate_chirp.png', dpi=150)
-        plt.close()
-        print(f"✓ Saved: {OUTPUT_DIR / 'test_generate_chirp.png'}")
+        def draw(plt):
+            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
+            time_axis = np.arange(len(chirp)) / 10000
+        
+            ax1.plot(time_axis * 1000, chirp)
+            ax1.set_title(f'Chirp Signal ({cfg.start_freq}-{cfg.end_freq} Hz, {cfg.duration}s)')
+            ax1.set_xlabel('Time (ms)')
+            ax1.set_ylabel('Amplitude')
+            ax1.grid(True)
+        
+            # Spectrogram
+            plot_spectrogram(ax2, chirp, 10000, 'Spectrogram')
+
+        save_debug_plot('test_generate_chirp', draw)
 
     def test_generate_sine(self):
         sine = generate_sine(freq=1000, duration=0.1, amplitude=0.8, sample_rate=10000)
@@ -127,30 +189,28 @@ class TestDSP(unittest.TestCase):
         self.assertEqual(sine.dtype, np.float32)
         
         # Save plot
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
-        time_axis = np.arange(len(sine)) / 10000
-        
-        # Time domain
-        ax1.plot(time_axis[:100] * 1000, sine[:100])
-        ax1.set_title('Sine Wave (1000 Hz, first 10ms)')
-        ax1.set_xlabel('Time (ms)')
-        ax1.set_ylabel('Amplitude')
-        ax1.grid(True)
-        
-        # FFT
-        fft = np.fft.rfft(sine)
-        freqs = np.fft.rfftfreq(len(sine), 1/10000)
-        ax2.plot(freqs, np.abs(fft))
-        ax2.set_title('Frequency Spectrum')
-        ax2.set_xlabel('Frequency (Hz)')
-        ax2.set_ylabel('Magnitude')
-        ax2.set_xlim(0, 2000)
-        ax2.grid(True)
-        
-        plt.tight_layout()
-        plt.savefig(OUTPUT_DIR / 'test_generate_sine.png', dpi=150)
-        plt.close()
-        print(f"✓ Saved: {OUTPUT_DIR / 'test_generate_sine.png'}")
+        def draw(plt):
+            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
+            time_axis = np.arange(len(sine)) / 10000
+        
+            # Time domain
+            ax1.plot(time_axis[:100] * 1000, sine[:100])
+            ax1.set_title('Sine Wave (1000 Hz, first 10ms)')
+            ax1.set_xlabel('Time (ms)')
+            ax1.set_ylabel('Amplitude')
+            ax1.grid(True)
+        
+            # FFT
+            fft = np.fft.rfft(sine)
+            freqs = np.fft.rfftfreq(len(sine), 1/10000)
+            ax2.plot(freqs, np.abs(fft))
+            ax2.set_title('Frequency Spectrum')
+            ax2.set_xlabel('Frequency (Hz)')
+            ax2.set_ylabel('Magnitude')
+            ax2.set_xlim(0, 2000)
+            ax2.grid(True)
+
+        save_debug_plot('test_generate_sine', draw)
 
     def test_normalize(self):
         sig = np.array([1, 2, 3, 4, 5], dtype=np.float32)
@@ -160,19 +220,18 @@ class TestDSP(unittest.TestCase):
         self.assertAlmostEqual(norm[0], 0.2)
         
         # Save plot
-        fig, ax = plt.subplots(figsize=(10, 5))
-        x = np.arange(len(sig))
-        ax.bar(x - 0.2, sig, width=0.4, label='Original', alpha=0.7)
-        ax.bar(x + 0.2, norm, width=0.4, label='Normalized (peak=1.0)', alpha=0.7)
-        ax.set_title('Signal Normalization')
-        ax.set_xlabel('Sample')
-        ax.set_ylabel('Amplitude')
-        ax.legend()
-        ax.grid(True, axis='y')
-        plt.tight_layout()
-        plt.savefig(OUTPUT_DIR / 'test_normalize.png', dpi=150)
-        plt.close()
-        print(f"✓ Saved: {OUTPUT_DIR / 'test_normalize.png'}")
+        def draw(plt):
+            fig, ax = plt.subplots(figsize=(10, 5))
+            x = np.arange(len(sig))
+            ax.bar(x - 0.2, sig, width=0.4, label='Original', alpha=0.7)
+            ax.bar(x + 0.2, norm, width=0.4, label='Normalized (peak=1.0)', alpha=0.7)
+            ax.set_title('Signal Normalization')
+            ax.set_xlabel('Sample')
+            ax.set_ylabel('Amplitude')
+            ax.legend()
+            ax.grid(True, axis='y')
+
+        save_debug_plot('test_normalize', draw)
 
     def test_signal_optimization(self):
         # Test processing gain
@@ -235,108 +294,228 @@ class TestDSP(unittest.TestCase):
         # Эхо - отражение TX chirp (который был без окна)
         recorded[echo_delay_samples:echo_delay_samples+len(chirp_tx)] = chirp_tx * 0.5
         
-        # Matched filter корреляция с реверсированным эталоном (КАК В СОНАРЕ!)
+        # Matched filter корреляция с эталоном без реверса (КАК В СОНАРЕ!):
+        # corr[k] - совпадение при задержке k отсчётов, т.е. индекс == лаг
         # Вариант 1: Windowed reference (better sidelobe suppression)
-        chirp_ref_reversed = chirp_ref[::-1]
         peak_idx_windowed, peak_windowed, corr_windowed = cross_correlation(
-            chirp_ref_reversed, recorded
+            chirp_ref, recorded
         )
         
         # Вариант 2: Non-windowed reference (higher sidelobes)
-        chirp_tx_reversed = chirp_tx[::-1]
         peak_idx_no_window, peak_no_window, corr_no_window = cross_correlation(
-            chirp_tx_reversed, recorded
+            chirp_tx, recorded
         )
         
-        # Вычисляем задержку как в distance.py
-        ref_offset_windowed = len(chirp_ref) - 1
-        ref_offset_no_window = len(chirp_tx) - 1
+        # Вычисляем задержку как в distance.py (индекс корреляции == лаг)
+        lag_windowed = peak_idx_windowed
+        lag_no_window = peak_idx_no_window
         
-        lag_windowed = peak_idx_windowed - ref_offset_windowed
-        lag_no_window = peak_idx_no_window - ref_offset_no_window
+        # float32 recording in, float32 correlation out (no float64 widening)
+        self.assertEqual(corr_windowed.dtype, np.float32)
         
         # Оба должны детектировать эхо
         self.assertGreater(peak_windowed, 0.5)
         self.assertGreater(peak_no_window, 0.5)
         
-        # Non-windowed должен найти близко к истине (может быть небольшой offset)
-        self.assertAlmostEqual(lag_no_window, echo_delay_samples, delta=150)
-        
-        # Windowed может иметь больший сдвиг из-за mismatch (TX без окна, ref с окном)
-        # Но все равно должен детектировать в разумных пределах
-        self.assertGreater(lag_windowed, echo_delay_samples - 350)
-        self.assertLess(lag_windowed, echo_delay_samples + 50)
+        # Оба находят задержку эха точно, несмотря на mismatch
+        # (TX без окна, ref с окном)
+        self.assertEqual(lag_no_window, echo_delay_samples)
+        self.assertEqual(lag_windowed, echo_delay_samples)
         
         # Save comprehensive plot
-        fig = plt.figure(figsize=(14, 10))
-        
-        # 1. Chirp signals comparison
-        ax1 = plt.subplot(3, 2, 1)
-        time_ms = np.arange(len(chirp_tx)) / 48000 * 1000
-        ax1.plot(time_ms, chirp_tx, label='TX (no window)', alpha=0.7)
-        ax1.plot(time_ms, chirp_ref, label='Reference (windowed)', alpha=0.7)
-        ax1.set_title('Chirp Signals: TX vs Reference')
-        ax1.set_xlabel('Time (ms)')
-        ax1.set_ylabel('Amplitude')
-        ax1.legend()
-        ax1.grid(True)
-        
-        # 2. Zoom on start (window effect)
-        ax2 = plt.subplot(3, 2, 2)
-        zoom_samples = 200
-        ax2.plot(time_ms[:zoom_samples], chirp_tx[:zoom_samples], 
-                label='TX (no window)', linewidth=2)
-        ax2.plot(time_ms[:zoom_samples], chirp_ref[:zoom_samples], 
-                label='Reference (windowed)', linewidth=2)
-        ax2.set_title('Window Effect at Start')
-        ax2.set_xlabel('Time (ms)')
-        ax2.set_ylabel('Amplitude')
-        ax2.legend()
-        ax2.grid(True)
-        
-        # 3. Spectrograms comparison
-        from scipy import signal as scipy_signal
-        ax3 = plt.subplot(3, 2, 3)
-        f, t, Sxx = scipy_signal.spectrogram(chirp_tx, fs=48000, nperseg=256)
-        ax3.pcolormesh(t * 1000, f/1000, 10 * np.log10(Sxx + 1e-10), 
-                      shading='gouraud', cmap='viridis')
-        ax3.set_title('TX Chirp Spectrogram (No Window)')
-        ax3.set_ylabel('Frequency (kHz)')
-        ax3.set_xlabel('Time (ms)')
-        
-        ax4 = plt.subplot(3, 2, 4)
-        f, t, Sxx = scipy_signal.spectrogram(chirp_ref, fs=48000, nperseg=256)
-        ax4.pcolormesh(t * 1000, f/1000, 10 * np.log10(Sxx + 1e-10), 
-                      shading='gouraud', cmap='viridis')
-        ax4.set_title('Reference Chirp Spectrogram (Windowed)')
-        ax4.set_ylabel('Frequency (kHz)')
-        ax4.set_xlabel('Time (ms)')
-        
-        # 5. Correlation comparison (sidelobe suppression)
-        ax5 = plt.subplot(3, 1, 3)
-        corr_time = np.arange(len(corr_windowed)) / 48000 * 1000
-        
-        # Normalize for comparison
-        corr_windowed_norm = corr_windowed / np.max(np.abs(corr_windowed))
-        corr_no_window_norm = corr_no_window / np.max(np.abs(corr_no_window))
-        
-        ax5.plot(corr_time, corr_no_window_norm, 
-                label='No window (higher sidelobes)', alpha=0.7, linewidth=1)
-        ax5.plot(corr_time, corr_windowed_norm, 
-                label='Windowed (suppressed sidelobes)', alpha=0.7, linewidth=1)
-        ax5.axvline(peak_idx_windowed / 48000 * 1000, color='r', 
-                   linestyle='--', label=f'Peak at {peak_idx_windowed} samples', linewidth=2)
-        ax5.set_title('Correlation Comparison: Windowing Effect on Sidelobes')
-        ax5.set_xlabel('Time (ms)')
-        ax5.set_ylabel('Normalized Correlation')
-        ax5.legend()
-        ax5.grid(True)
-        ax5.set_ylim(-0.3, 1.1)
-        
-        plt.tight_layout()
-        plt.savefig(OUTPUT_DIR / 'test_chirp_windowing.png', dpi=150)
-        plt.close()
-        print(f"✓ Saved: {OUTPUT_DIR / 'test_chirp_windowing.png'}")
+        def draw(plt):
+            fig = plt.figure(figsize=(14, 10))
+        
+            # 1. Chirp signals comparison
+            ax1 = plt.subplot(3, 2, 1)
+            time_ms = np.arange(len(chirp_tx)) / 48000 * 1000
+            ax1.plot(time_ms, chirp_tx, label='TX (no window)', alpha=0.7)
+            ax1.plot(time_ms, chirp_ref, label='Reference (windowed)', alpha=0.7)
+            ax1.set_title('Chirp Signals: TX vs Reference')
+            ax1.set_xlabel('Time (ms)')
+            ax1.set_ylabel('Amplitude')
+            ax1.legend()
+            ax1.grid(True)
+        
+            # 2. Zoom on start (window effect)
+            ax2 = plt.subplot(3, 2, 2)
+            zoom_samples = 200
+            ax2.plot(time_ms[:zoom_samples], chirp_tx[:zoom_samples], 
+                    label='TX (no window)', linewidth=2)
+            ax2.plot(time_ms[:zoom_samples], chirp_ref[:zoom_samples], 
+                    label='Reference (windowed)', linewidth=2)
+            ax2.set_title('Window Effect at Start')
+            ax2.set_xlabel('Time (ms)')
+            ax2.set_ylabel('Amplitude')
+            ax2.legend()
+            ax2.grid(True)
+        
+            # 3. Spectrograms comparison
+            plot_spectrogram(plt.subplot(3, 2, 3), chirp_tx, 48000,
+                             'TX Chirp Spectrogram (No Window)', khz=True, cmap='viridis')
+            plot_spectrogram(plt.subplot(3, 2, 4), chirp_ref, 48000,
+                             'Reference Chirp Spectrogram (Windowed)', khz=True, cmap='viridis')
+        
+            # 5. Correlation comparison (sidelobe suppression)
+            ax5 = plt.subplot(3, 1, 3)
+            corr_time = np.arange(len(corr_windowed)) / 48000 * 1000
+        
+            # Normalize for comparison
+            corr_windowed_norm = corr_windowed / np.max(np.abs(corr_windowed))
+            corr_no_window_norm = corr_no_window / np.max(np.abs(corr_no_window))
+        
+            ax5.plot(corr_time, corr_no_window_norm, 
+                    label='No window (higher sidelobes)', alpha=0.7, linewidth=1)
+            ax5.plot(corr_time, corr_windowed_norm, 
+                    label='Windowed (suppressed sidelobes)', alpha=0.7, linewidth=1)
+            ax5.axvline(peak_idx_windowed / 48000 * 1000, color='r', 
+                       linestyle='--', label=f'Peak at {peak_idx_windowed} samples', linewidth=2)
+            ax5.set_title('Correlation Comparison: Windowing Effect on Sidelobes')
+            ax5.set_xlabel('Time (ms)')
+            ax5.set_ylabel('Normalized Correlation')
+            ax5.legend()
+            ax5.grid(True)
+            ax5.set_ylim(-0.3, 1.1)
+
+        save_debug_plot('test_chirp_windowing', draw)
+
+class _EchoStream:
+    """Stand-in for the persistent audio stream: records play_signal * gain
+    delayed by `delay` samples (plus a little noise)."""
+
+    def __init__(self, delay, gain=0.4):
+        self.delay = delay
+        self.gain = gain
+        self.rng = np.random.default_rng(0)
+
+    def record_buffer(self, n_samples):
+        return np.empty(n_samples, dtype=np.float32)
+
+    def play_and_record(self, play_signal, extra_record_seconds=0.1,
+                        return_tx_index=True, out=None):
+        n = len(play_signal) + int(extra_record_seconds * 48000)
+        recorded = out[:n] if out is not None else np.empty(n, dtype=np.float32)
+        recorded[:] = self.rng.standard_normal(n) * 1e-3
+        m = min(len(play_signal), n - self.delay)
+        recorded[self.delay:self.delay + m] += self.gain * play_signal[:m]
+        return (recorded, 0) if return_tx_index else recorded
+
+
+@unittest.skipIf(distance is None, "sounddevice/PortAudio not available")
+class TestLagConvention(unittest.TestCase):
+    """Latency and distance report a chirp delayed by D samples as lag D."""
+
+    cfg_chirp = ChirpConfig(start_freq=2000, end_freq=12000, duration=0.01, amplitude=0.8)
+
+    def test_latency_lag(self):
+        chirp, chirp_ref = latency._latency_chirps(2000.0, 12000.0, 0.01, 0.8, 0.0, 48000)
+        delay = 60  # 1.25 ms, inside the 0.5-3 ms direct-path window
+        recorded = _EchoStream(delay).play_and_record(
+            chirp, extra_record_seconds=0.1, return_tx_index=False
+        )
+        latency_s, lag, _ = latency._pick_latency_from_recording(
+            recorded=recorded, chirp_ref=chirp_ref, sample_rate=48000
+        )
+        self.assertEqual(lag, delay)
+        self.assertAlmostEqual(latency_s * 48000, delay, delta=0.5)
+
+    def test_distance_lag(self):
+        latency_samples = 60
+        echo = 300  # round trip beyond the system latency
+        stream = _EchoStream(latency_samples + echo)
+        with unittest.mock.patch.object(distance, "get_global_stream", return_value=stream):
+            result = distance.measure_distance(
+                AudioDeviceConfig(sample_rate=48000),
+                self.cfg_chirp,
+                system_latency_s=latency_samples / 48000,
+                min_distance_m=0.0,
+                max_distance_m=5.0,
+                enable_smoothing=False,
+            )
+        self.assertEqual(result["lag_samples"], latency_samples + echo)
+        self.assertAlmostEqual(result["refined_lag"], latency_samples + echo, delta=0.5)
+        self.assertAlmostEqual(result["distance_m"], 343.0 * echo / 48000 / 2, delta=0.005)
+
+    def test_distance_rejects_short_recording(self):
+        stream = _EchoStream(360)
+        full = stream.play_and_record
+        stream.play_and_record = lambda *a, **kw: (full(*a, **kw)[0][:-10], 0)
+        with unittest.mock.patch.object(distance, "get_global_stream", return_value=stream):
+            with self.assertRaises(RuntimeError):
+                distance.measure_distance(
+                    AudioDeviceConfig(sample_rate=48000),
+                    self.cfg_chirp,
+                    system_latency_s=60 / 48000,
+                    min_distance_m=0.0,
+                    max_distance_m=5.0,
+                    enable_smoothing=False,
+                )
+
+
+def _baseline_echo_peak(corr_window):
+    """Echo peak choice as measure_distance made it with find_peaks."""
+    peaks = find_peaks(corr_window, num_peaks=15, min_distance=50)
+    if not peaks:
+        return int(np.argmax(corr_window))
+    strong_peaks = [(idx, val) for idx, val in peaks if val > peaks[0][1] * 0.3]
+    if len(strong_peaks) > 1:
+        top2_diff = (strong_peaks[0][1] - strong_peaks[1][1]) / strong_peaks[0][1]
+        if top2_diff < 0.2:
+            return min(strong_peaks[:2], key=lambda p: p[0])[0]
+    return strong_peaks[0][0]
+
+
+def _echo_window(echoes, n=2000, noise=0.02, seed=0):
+    """Synthetic correlation window: an oscillating pulse per (index, height)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    window = rng.standard_normal(n) * noise
+    for idx, height in echoes:
+        window += height * np.exp(-((t - idx) / 12.0) ** 2) * np.cos(0.6 * (t - idx))
+    return window.astype(np.float32)
+
+
+@unittest.skipIf(distance is None, "sounddevice/PortAudio not available")
+class TestSelectEchoPeak(unittest.TestCase):
+    """_select_echo_peak matches the find_peaks-based rule it replaced."""
+
+    def assert_same_choice(self, window):
+        self.assertEqual(distance._select_echo_peak(window), _baseline_echo_peak(window))
+
+    def test_two_echoes(self):
+        # Clearly stronger later echo wins; clearly stronger earlier one too
+        window = _echo_window([(400, 0.5), (1200, 1.0)])
+        self.assertEqual(distance._select_echo_peak(window), 1200)
+        self.assert_same_choice(window)
+        window = _echo_window([(400, 1.0), (1200, 0.5)])
+        self.assertEqual(distance._select_echo_peak(window), 400)
+        self.assert_same_choice(window)
+
+    def test_near_equal_echoes(self):
+        # Within 20% of each other: the earlier one, even though weaker
+        window = _echo_window([(500, 0.9), (900, 1.0)])
+        self.assertEqual(distance._select_echo_peak(window), 500)
+        self.assert_same_choice(window)
+
+    def test_weak_second_echo(self):
+        # Below 30% of the maximum: ignored
+        window = _echo_window([(300, 0.25), (1500, 1.0)])
+        self.assertEqual(distance._select_echo_peak(window), 1500)
+        self.assert_same_choice(window)
+
+    def test_no_positive_peak(self):
+        window = -np.abs(_echo_window([], noise=0.1)) - 0.01
+        self.assert_same_choice(window)
+
+    def test_random_windows(self):
+        rng = np.random.default_rng(1)
+        for seed in range(200):
+            echoes = [(int(rng.integers(0, 2000)), float(rng.uniform(0.2, 1.0)))
+                      for _ in range(int(rng.integers(1, 4)))]
+            window = _echo_window(echoes, noise=float(rng.uniform(0.0, 0.2)), seed=seed)
+            with self.subTest(seed=seed, echoes=echoes):
+                self.assert_same_choice(window)
+
 
 if __name__ == '__main__':
     unittest.main()
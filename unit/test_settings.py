@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from echopi import settings
+
+
+class TestSettings(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config_dir = Path(tmp.name) / "echopi"
+        self.config_file = self.config_dir / "init.json"
+        for name, value in (("CONFIG_DIR", self.config_dir),
+                            ("CONFIG_FILE", self.config_file),
+                            ("_dir_ready", False)):
+            patcher = unittest.mock.patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        settings._invalidate_cache()
+        self.addCleanup(settings._invalidate_cache)
+
+    def read_file(self):
+        return json.loads(self.config_file.read_text())
+
+    def test_batch_writes_once(self):
+        with unittest.mock.patch.object(settings.os, "replace", wraps=os.replace) as replace:
+            with settings.batch_updates() as batch:
+                self.assertTrue(settings.set_system_latency(0.002))
+                self.assertTrue(settings.set_gui_settings({"medium": "water"}))
+                # Deferred: visible to reads, not yet on disk
+                self.assertEqual(settings.get_system_latency(), 0.002)
+                self.assertFalse(self.config_file.exists())
+                self.assertIsNone(batch.saved)
+        self.assertEqual(replace.call_count, 1)
+        self.assertTrue(batch.saved)
+        data = self.read_file()
+        self.assertEqual(data["system_latency_s"], 0.002)
+        self.assertEqual(data["medium"], "water")
+
+    def test_nested_batch(self):
+        with settings.batch_updates() as outer:
+            with settings.batch_updates() as inner:
+                settings.set_system_latency(0.003)
+            self.assertIs(inner, outer)
+            self.assertIsNone(inner.saved)
+            self.assertFalse(self.config_file.exists())
+        self.assertTrue(outer.saved)
+        self.assertEqual(self.read_file()["system_latency_s"], 0.003)
+
+    def test_empty_batch(self):
+        with settings.batch_updates() as batch:
+            pass
+        self.assertTrue(batch.saved)
+        self.assertFalse(self.config_file.exists())
+
+    def test_batch_reports_failed_write(self):
+        # CONFIG_DIR below a regular file: mkdir fails
+        blocker = self.config_dir.parent / "blocker"
+        blocker.write_text("")
+        with unittest.mock.patch.object(settings, "CONFIG_DIR", blocker / "echopi"), \
+                unittest.mock.patch.object(settings, "CONFIG_FILE", blocker / "echopi" / "init.json"):
+            with settings.batch_updates() as batch:
+                self.assertTrue(settings.set_system_latency(0.004))
+            self.assertIs(batch.saved, False)
+            self.assertFalse(settings.set_system_latency(0.004))
+        # Nothing leaks into the next batch
+        with settings.batch_updates() as batch:
+            pass
+        self.assertTrue(batch.saved)
+        self.assertFalse(self.config_file.exists())
+
+    def test_cache_reloads_on_external_change(self):
+        self.assertTrue(settings.set_max_distance(5.0))
+        self.assertEqual(settings.get_max_distance(), 5.0)
+        view = settings.get_all_settings()
+        # Edited outside EchoPi (size changes, so the cache key does too)
+        data = self.read_file()
+        data["max_distance_m"] = 12.5
+        data["extra"] = "value"
+        self.config_file.write_text(json.dumps(data))
+        self.assertEqual(settings.get_max_distance(), 12.5)
+        # An earlier view is a snapshot, not updated in place
+        self.assertEqual(view["max_distance_m"], 5.0)
+
+    def test_defaults_without_file(self):
+        self.assertEqual(settings.get_system_latency(),
+                         settings.DEFAULT_SETTINGS["system_latency_s"])
+        self.assertEqual(settings.load_settings(), settings.DEFAULT_SETTINGS)
+
+
+if __name__ == '__main__':
+    unittest.main()